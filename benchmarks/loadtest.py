@@ -0,0 +1,333 @@
+from benchmarks.seed import seed, open_client, login, PASSWORD
+
+import argparse
+import asyncio
+import datetime
+import json
+import re
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from sqlalchemy import select
+from core import database
+from core.database import async_session_maker
+from models.users import User
+from routers.auth import token_cache, user_cache
+
+# Нагрузочный прогон всех эндпоинтов через ASGI-приложение в том же процессе:
+#   python -m benchmarks.loadtest -o baseline.json
+#   python -m benchmarks.loadtest --compare baseline.json
+# Кэш ответов отключается через RESPONSE_CACHE_TTL=0
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+@dataclass
+class Context:
+    users: int
+    posts: int
+    reviews: int
+    headers: dict = field(default_factory=dict)
+    refresh_token: str = ""
+    # Счётчики сквозные для всех уровней конкурентности: удалённые
+    # и созданные записи не должны повторяться
+    counters: dict[str, int] = field(default_factory=dict)
+    new_users: list[int] = field(default_factory=list)
+
+    def next(self, name: str) -> int:
+        value = self.counters.get(name, 0)
+        self.counters[name] = value + 1
+        return value
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    # (контекст, номер запроса) -> аргументы client.request: url, json, data
+    request: Callable[[Context, int], dict]
+    auth: bool = False
+    # Доля от --requests: для bcrypt и тяжёлых выгрузок запросов меньше
+    share: float = 1.0
+    # Подготовка перед прогоном; возвращает, сколько запросов возможно
+    setup: Callable[[Context], Awaitable[int]] | None = None
+
+
+def _user_id(ctx: Context, i: int) -> int:
+    # Любой пользователь, кроме администратора
+    return 2 + i % (ctx.users - 1)
+
+
+def _new_user(n: int) -> dict:
+    return {"url": "/users/", "json": {"name": f"load{n}",
+                                       "email": f"load{n}@microblog.dev",
+                                       "password": PASSWORD}}
+
+
+async def _collect_new_users(ctx: Context) -> int:
+    async with async_session_maker() as db:
+        ctx.new_users = list(await db.scalars(
+            select(User.id).where(User.email.like("load%"))
+            .order_by(User.id.desc())))
+    return len(ctx.new_users)
+
+
+SCENARIOS = [
+    Scenario("list posts", "GET",
+             lambda ctx, i: {"url": "/posts/"}),
+    Scenario("list posts by user", "GET",
+             lambda ctx, i: {"url": f"/posts/?user_id={_user_id(ctx, i)}"}),
+    Scenario("list posts by rating", "GET",
+             lambda ctx, i: {"url": "/posts/?sort=rating&limit=20"}),
+    Scenario("post stats", "GET",
+             lambda ctx, i: {"url": f"/posts/{1 + i % ctx.posts}/stats"}),
+    Scenario("post detail", "GET",
+             lambda ctx, i: {"url": f"/posts/{1 + i % ctx.posts}"}),
+    Scenario("search posts", "GET",
+             lambda ctx, i: {"url": f"/posts/search?q=post+{1 + i % 100}"}),
+    Scenario("list reviews", "GET",
+             lambda ctx, i: {"url": "/reviews/"}),
+    Scenario("review stats", "GET",
+             lambda ctx, i: {"url": "/reviews/stats?bucket=hour"}),
+    Scenario("post reviews", "GET",
+             lambda ctx, i: {"url": f"/reviews/{1 + i % ctx.posts}"}),
+    Scenario("list users", "GET",
+             lambda ctx, i: {"url": "/users/"}, auth=True),
+    Scenario("home feed", "GET",
+             lambda ctx, i: {"url": "/users/me/feed"}, auth=True),
+    Scenario("export posts", "GET",
+             lambda ctx, i: {"url": "/posts/export"}, auth=True, share=0.05),
+    Scenario("export reviews", "GET",
+             lambda ctx, i: {"url": f"/reviews/export?post_id={1 + i}"},
+             auth=True, share=0.25),
+    Scenario("login", "POST",
+             lambda ctx, i: {"url": "/users/token", "data": {
+                 "username": f"user{_user_id(ctx, i)}@microblog.dev",
+                 "password": PASSWORD}}, share=0.1),
+    Scenario("refresh token", "POST",
+             lambda ctx, i: {"url": "/users/refresh-token",
+                             "json": {"refresh_token": ctx.refresh_token}}),
+    Scenario("create user", "POST",
+             lambda ctx, i: _new_user(ctx.next("user")), share=0.1),
+    Scenario("update user", "PUT",
+             lambda ctx, i: {"url": f"/users/{_user_id(ctx, i)}", "json": {
+                 "name": f"user{_user_id(ctx, i)}", "password": PASSWORD,
+                 "email": f"user{_user_id(ctx, i)}@microblog.dev"}},
+             auth=True, share=0.1),
+    Scenario("create post", "POST",
+             lambda ctx, i: {"url": "/posts/", "json": {
+                 "title": f"Load {i}", "text": f"Load post {i}",
+                 "user_id": _user_id(ctx, i)}}, auth=True),
+    Scenario("bulk posts", "POST",
+             lambda ctx, i: {"url": "/posts/bulk", "json": [
+                 {"title": f"Bulk {i}.{n}", "text": "Bulk post",
+                  "user_id": _user_id(ctx, n)} for n in range(100)]},
+             auth=True, share=0.1),
+    Scenario("update post", "PUT",
+             lambda ctx, i: {"url": f"/posts/{1 + i % (ctx.posts // 2)}",
+                             "json": {"title": f"Edited {i}",
+                                      "text": "Edited post", "user_id": 1}},
+             auth=True),
+    Scenario("create review", "POST",
+             lambda ctx, i: {"url": "/reviews/", "json": {
+                 "comment": f"Load {i}", "grade": 1 + i % 5,
+                 "post_id": 1 + i % (ctx.posts // 2), "user_id": 1}},
+             auth=True),
+    Scenario("bulk reviews", "POST",
+             lambda ctx, i: {"url": "/reviews/bulk", "json": [
+                 {"comment": f"Bulk {i}.{n}", "grade": 1 + n % 5,
+                  "post_id": 1 + (i * 100 + n) % (ctx.posts // 2),
+                  "user_id": 1} for n in range(100)]},
+             auth=True, share=0.1),
+    Scenario("follow user", "POST",
+             lambda ctx, i: {"url": f"/users/{_user_id(ctx, i)}/follow"},
+             auth=True),
+    Scenario("unfollow user", "DELETE",
+             lambda ctx, i: {"url": f"/users/{_user_id(ctx, i)}/follow"},
+             auth=True),
+    # Удаляются записи с конца диапазона: обновления и отзывы
+    # выше идут в первую половину постов
+    Scenario("delete review", "DELETE",
+             lambda ctx, i: {
+                 "url": f"/reviews/{ctx.reviews - ctx.next('review')}"},
+             auth=True),
+    Scenario("delete post", "DELETE",
+             lambda ctx, i: {
+                 "url": f"/posts/{ctx.posts - ctx.next('post')}"},
+             auth=True),
+    Scenario("delete user", "DELETE",
+             lambda ctx, i: {"url": f"/users/{ctx.new_users.pop()}"},
+             auth=True, share=0.1, setup=_collect_new_users),
+    Scenario("metrics", "GET", lambda ctx, i: {"url": "/metrics"}),
+]
+
+
+def percentile(values: list[float], q: float) -> float:
+    # Ближайший ранг по отсортированной выборке
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(q * len(values)) - 1))]
+
+
+async def run_scenario(client, ctx: Context, scenario: Scenario,
+                       concurrency: int, requests: int) -> dict:
+    if scenario.setup is not None:
+        requests = min(requests, await scenario.setup(ctx))
+    indexes = iter(range(requests))
+    latencies, statements, errors = [], [], {}
+
+    async def worker() -> None:
+        for i in indexes:
+            kwargs = scenario.request(ctx, i)
+            started = time.perf_counter()
+            try:
+                response = await client.request(
+                    scenario.method, **kwargs,
+                    headers=ctx.headers if scenario.auth else None)
+            except Exception:
+                # Необработанное исключение приложения ASGITransport
+                # пробрасывает как есть; в живом сервере это был бы 500
+                latencies.append(time.perf_counter() - started)
+                errors[500] = errors.get(500, 0) + 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors[response.status_code] = errors.get(
+                    response.status_code, 0) + 1
+            match = SERVER_TIMING_QUERIES.search(
+                response.headers.get("server-timing", ""))
+            if match:
+                statements.append(int(match.group(1)))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {"endpoint": scenario.name,
+            "concurrency": concurrency,
+            "requests": len(latencies),
+            "errors": sum(errors.values()),
+            "error_codes": {str(code): count
+                            for code, count in sorted(errors.items())},
+            "throughput": len(latencies) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "sql_per_request": (sum(statements) / len(statements)
+                                if statements else 0.0)}
+
+
+async def run(args, scenarios: list[Scenario]) -> list[dict]:
+    await seed(args.users, args.posts, args.reviews, args.seed, args.reset)
+    token_cache.clear()
+    user_cache.clear()
+    ctx = Context(args.users, args.posts, args.reviews)
+    results = []
+    try:
+        async with open_client() as client:
+            tokens = await login(client)
+            ctx.headers = {"Authorization":
+                           f"Bearer {tokens['access_token']}"}
+            ctx.refresh_token = tokens["refresh_token"]
+            for concurrency in args.concurrency:
+                for scenario in scenarios:
+                    requests = max(1, int(args.requests * scenario.share))
+                    row = await run_scenario(client, ctx, scenario,
+                                             concurrency, requests)
+                    print(format_row(row), flush=True)
+                    results.append(row)
+    finally:
+        await database.engine.dispose()
+    return results
+
+
+def format_row(row: dict) -> str:
+    return (f"{row['endpoint']:<22} c={row['concurrency']:<3} "
+            f"{row['throughput']:8.1f} req/s  p50 {row['p50_ms']:7.1f}  "
+            f"p95 {row['p95_ms']:7.1f}  p99 {row['p99_ms']:7.1f} ms  "
+            f"sql {row['sql_per_request']:4.1f}  errors {row['errors']}")
+
+
+def compare(results: list[dict], baseline: dict,
+            threshold: float) -> list[str]:
+    # Регрессия: пропускная способность упала или p95 вырос больше чем
+    # на threshold, стало больше SQL-запросов или ошибок
+    previous = {(row["endpoint"], row["concurrency"]): row
+                for row in baseline["results"]}
+    problems = []
+    for row in results:
+        old = previous.get((row["endpoint"], row["concurrency"]))
+        if old is None:
+            continue
+        name = f"{row['endpoint']} c={row['concurrency']}"
+        if row["throughput"] < old["throughput"] * (1 - threshold):
+            problems.append(f"{name}: throughput {old['throughput']:.1f} -> "
+                            f"{row['throughput']:.1f} req/s")
+        if row["p95_ms"] > old["p95_ms"] * (1 + threshold):
+            problems.append(f"{name}: p95 {old['p95_ms']:.1f} -> "
+                            f"{row['p95_ms']:.1f} ms")
+        if row["sql_per_request"] > old["sql_per_request"] + 0.01:
+            problems.append(f"{name}: sql/request "
+                            f"{old['sql_per_request']:.2f} -> "
+                            f"{row['sql_per_request']:.2f}")
+        if row["errors"] > old["errors"]:
+            problems.append(f"{name}: errors {old['errors']} -> "
+                            f"{row['errors']}")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Нагрузочный прогон эндпоинтов с отчётом в JSON")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--reviews", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42,
+                        help="зерно генератора данных")
+    parser.add_argument("--reset", action="store_true",
+                        help="разрешить пересоздать таблицы не в SQLite")
+    parser.add_argument("-c", "--concurrency", default="1,8,32",
+                        type=lambda value: [int(level)
+                                            for level in value.split(",")],
+                        help="уровни конкурентности через запятую")
+    parser.add_argument("-n", "--requests", type=int, default=200,
+                        help="запросов на эндпоинт и уровень")
+    parser.add_argument("-k", dest="pattern", default="",
+                        help="только эндпоинты с подстрокой в имени")
+    parser.add_argument("-o", "--output", help="куда сохранить JSON")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="допустимое ухудшение, доля (0.2 = 20%%)")
+    args = parser.parse_args()
+    deletes = args.requests * len(args.concurrency)
+    if args.users < 2 or deletes > args.posts // 2 or deletes > args.reviews:
+        parser.error("слишком мало данных для выбранного числа запросов")
+
+    scenarios = [scenario for scenario in SCENARIOS
+                 if args.pattern in scenario.name]
+    results = asyncio.run(run(args, scenarios))
+    report = {"created_at": datetime.datetime.now().isoformat(),
+              "database": database.engine.dialect.name,
+              "params": {"users": args.users, "posts": args.posts,
+                         "reviews": args.reviews, "seed": args.seed,
+                         "concurrency": args.concurrency,
+                         "requests": args.requests},
+              "results": results}
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            problems = compare(results, json.load(file), args.threshold)
+        for problem in problems:
+            print("REGRESSION  " + problem)
+        if problems:
+            return 1
+        print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+from benchmarks.seed import seed, open_client, login, PASSWORD
+
+import argparse
+import asyncio
+import sys
+from dataclasses import dataclass, field
+from sqlalchemy import event
+from core import database
+from routers.auth import token_cache, user_cache
+
+USERS, POSTS, REVIEWS = 50, 1000, 5000
+NEW_USER_ID = USERS + 1
+
+
+@dataclass
+class Case:
+    name: str
+    method: str
+    path: str
+    budget: int
+    auth: bool = False
+    json: dict | list | None = None
+    data: dict | None = None
+    # Таблицы, которые эндпоинт читает по первичному ключу: SQLite
+    # показывает такой обход как SCAN даже при LIMIT
+    allow_scan: set[str] = field(default_factory=set)
+
+
+NEW_USER = {"name": "newcomer", "email": "newcomer@microblog.dev",
+            "password": PASSWORD}
+# Размер пачек в bulk-кейсах: INSERT ... RETURNING в порядке параметров
+# SQLite пишет по строке (BULK запросов), PostgreSQL - одним запросом
+BULK = 10
+# Бюджет - это число запросов задуманного плана, расписанное в комментарии
+# к кейсу: лишний запрос (N+1, повторная проверка) сразу валит кейс.
+# Списки с ETag читают версии коллекций (1) и страницу (1). Бюджеты
+# сняты на SQLite; в PostgreSQL запись отзыва ещё берёт блокировку
+# агрегатов (+1)
+CASES = [
+    Case("root", "GET", "/", 0),
+    # Пользователь токена (первый запрос с ним) и страница
+    Case("list users", "GET", "/users/", 2, auth=True,
+         allow_scan={"users"}),
+    Case("list posts", "GET", "/posts/", 2),
+    Case("list posts by rating", "GET", "/posts/?sort=rating", 2),
+    Case("list posts by user", "GET", "/posts/?user_id=1", 2),
+    Case("post stats", "GET", "/posts/1/stats", 1),
+    # Версии, пост с автором и статистикой, первая страница отзывов
+    Case("post detail", "GET", "/posts/1", 3),
+    # Первый поиск на SQLite загружает индекс в память целиком (1),
+    # затем читает найденные посты (1)
+    Case("search posts", "GET", "/posts/search?q=post", 2,
+         allow_scan={"posts"}),
+    Case("search posts again", "GET", "/posts/search?q=text", 1),
+    Case("export posts", "GET", "/posts/export", 1, auth=True,
+         allow_scan={"posts"}),
+    Case("list reviews", "GET", "/reviews/", 2),
+    Case("list reviews by user", "GET", "/reviews/?user_id=1", 2),
+    Case("list reviews by post", "GET", "/reviews/?post_id=1", 2),
+    # Версии, ряд по агрегатам, лучшие посты. Лучшие посты сортируются
+    # по среднему за окно - по агрегатам, а не по reviews, но без
+    # сортировки не обойтись
+    Case("review stats", "GET", "/reviews/stats?bucket=hour", 3,
+         allow_scan={"<sort>"}),
+    # Версии, проверка поста, отзывы
+    Case("post reviews", "GET", "/reviews/1", 3),
+    Case("export reviews", "GET", "/reviews/export?post_id=1", 1, auth=True),
+    # Проверка email, INSERT, перечитывание строки
+    Case("create user", "POST", "/users/", 3, json=NEW_USER),
+    Case("login", "POST", "/users/token", 1,
+         data={"username": NEW_USER["email"], "password": PASSWORD}),
+    # INSERT поста и статистики, версия, перечитывание, фоновая раздача
+    # по лентам подписчиков
+    Case("create post", "POST", "/posts/", 5, auth=True,
+         json={"title": "New", "text": "New post", "user_id": 1}),
+    # Проверка авторов, BULK вставок, статистика, версия, раздача по лентам
+    Case("bulk posts", "POST", "/posts/bulk", 4 + BULK, auth=True,
+         json=[{"title": f"Bulk {i}", "text": "Bulk post", "user_id": i}
+               for i in range(1, BULK + 1)]),
+    # UPDATE, версия
+    Case("update post", "PUT", "/posts/2", 2, auth=True,
+         json={"title": "Edited", "text": "Edited post", "user_id": 1}),
+    # В запросе: пометка, задача очистки, версии (3). Фоновая очистка:
+    # захват задачи, пачка отзывов (DELETE, статистика, 2 агрегата,
+    # прогресс, версии), пустая пачка, ленты, архив, статистика, агрегаты
+    # поста, сам пост, прогресс, завершение (15)
+    Case("delete post", "DELETE", "/posts/3", 3 + 15, auth=True),
+    # Проверка поста, INSERT, статистика, 2 агрегата (час/сутки и по
+    # посту), версии, перечитывание
+    Case("create review", "POST", "/reviews/", 7, auth=True,
+         json={"comment": "Nice", "grade": 5, "post_id": 1, "user_id": 1}),
+    # Проверка постов и авторов, BULK вставок, статистика, 2 агрегата,
+    # версии
+    Case("bulk reviews", "POST", "/reviews/bulk", 6 + BULK, auth=True,
+         json=[{"comment": "Bulk", "grade": 4, "post_id": i, "user_id": 1}
+               for i in range(10, 10 + BULK)]),
+    # DELETE/UPDATE ... RETURNING, статистика, 2 агрегата, версии
+    Case("delete review", "DELETE", "/reviews/5", 5, auth=True),
+    Case("deactivate review", "POST", "/reviews/6/deactivate", 5, auth=True),
+    # Проверка автора, INSERT подписки, счётчик подписчиков, посты автора,
+    # вставка в ленту
+    Case("follow user", "POST", "/users/2/follow", 5, auth=True),
+    # Лента из timeline_entries и посты "звёзд" с большим числом подписчиков
+    Case("home feed", "GET", "/users/me/feed", 2, auth=True),
+    # DELETE подписки, счётчик, записи ленты
+    Case("unfollow user", "DELETE", "/users/2/follow", 3, auth=True),
+    # Проверка существования до bcrypt, UPDATE, версия "users"
+    Case("update user", "PUT", f"/users/{NEW_USER_ID}", 3, auth=True,
+         json={**NEW_USER, "name": "renamed"}),
+    # В запросе: пометка, задача очистки, версии (3). Фоновая очистка:
+    # захват, отзывы, архив, посты, подписки в обе стороны, ленты,
+    # пользователь, прогресс, завершение (10)
+    Case("delete user", "DELETE", f"/users/{NEW_USER_ID}", 3 + 10,
+         auth=True),
+]
+
+
+class StatementRecorder:
+    def __init__(self):
+        self.statements: list[tuple[str, object]] = []
+        self.active = False
+
+    def __call__(self, conn, cursor, statement, parameters, context,
+                 executemany):
+        if self.active:
+            self.statements.append((statement, parameters))
+
+
+def _full_scans(dialect: str, plan: list[str]) -> set[str]:
+    # SQLite: "SCAN <table>" без индекса или сортировка во временном B-дереве;
+    # PostgreSQL: "Seq Scan on <table>" при выключенном enable_seqscan
+    scans = set()
+    for line in plan:
+        words = line.split()
+        if dialect == "sqlite":
+            if line.startswith("SCAN ") and "USING" not in line:
+                scans.add(words[1])
+            elif "TEMP B-TREE" in line:
+                scans.add("<sort>")
+        elif "Seq Scan on" in line:
+            scans.add(words[words.index("on") + 1])
+    return scans
+
+
+async def explain(statements: list[tuple[str, object]]) -> set[str]:
+    dialect = database.engine.dialect.name
+    prefix = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+    scans = set()
+    async with database.engine.connect() as conn:
+        if dialect == "postgresql":
+            await conn.exec_driver_sql("SET enable_seqscan = off")
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith("SELECT"):
+                continue
+            result = await conn.exec_driver_sql(prefix + statement,
+                                                parameters)
+            plan = [str(row[-1]) for row in result]
+            scans |= _full_scans(dialect, plan)
+    return scans
+
+
+async def run(cases: list[Case], reset: bool = False) -> list[dict]:
+    await seed(USERS, POSTS, REVIEWS, reset=reset)
+    token_cache.clear()
+    user_cache.clear()
+    recorder = StatementRecorder()
+    event.listen(database.engine.sync_engine, "before_cursor_execute",
+                 recorder)
+    report = []
+    try:
+        async with open_client() as client:
+            headers = {"Authorization":
+                       f"Bearer {(await login(client))['access_token']}"}
+            for case in cases:
+                recorder.statements.clear()
+                recorder.active = True
+                response = await client.request(
+                    case.method, case.path, json=case.json, data=case.data,
+                    headers=headers if case.auth else None)
+                recorder.active = False
+                scans = await explain(recorder.statements) - case.allow_scan
+                report.append({"name": case.name,
+                               "status": response.status_code,
+                               "statements": len(recorder.statements),
+                               "budget": case.budget,
+                               "sql": [statement for statement, _
+                                       in recorder.statements],
+                               "full_scans": sorted(scans)})
+    finally:
+        event.remove(database.engine.sync_engine, "before_cursor_execute",
+                     recorder)
+        await database.engine.dispose()
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Проверка числа SQL-запросов и планов для эндпоинтов")
+    parser.add_argument("-k", dest="pattern", default="",
+                        help="запускать только кейсы с подстрокой в имени")
+    parser.add_argument("-v", dest="verbose", action="store_true",
+                        help="печатать выполненные SQL-запросы")
+    parser.add_argument("--reset", action="store_true",
+                        help="разрешить пересоздать таблицы не в SQLite")
+    args = parser.parse_args()
+    cases = [case for case in CASES if args.pattern in case.name]
+    failed = 0
+    for row in asyncio.run(run(cases, args.reset)):
+        problems = []
+        if row["status"] >= 400:
+            problems.append(f"HTTP {row['status']}")
+        if row["statements"] > row["budget"]:
+            problems.append(f"{row['statements']} statements > "
+                            f"budget {row['budget']}")
+        if row["full_scans"]:
+            problems.append("full scan: " + ", ".join(row["full_scans"]))
+        failed += bool(problems)
+        print(f"{'FAIL' if problems else 'ok':4}  {row['name']:<24} "
+              f"{row['statements']}/{row['budget']}  {'; '.join(problems)}")
+        if args.verbose:
+            for statement in row["sql"]:
+                print("      " + " ".join(statement.split())[:160])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    # python -m benchmarks.query_budget
+    sys.exit(main())
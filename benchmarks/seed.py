@@ -0,0 +1,88 @@
+import os
+
+# Окружение задаётся до импорта приложения: config читает переменные
+# при импорте. База бенчмарков своя, $psql не используется: seed
+# пересоздаёт все таблицы
+os.environ.setdefault("BENCHMARK_DATABASE_URL",
+                      "sqlite+aiosqlite:///./benchmark.db")
+os.environ["psql"] = os.environ["BENCHMARK_DATABASE_URL"]
+os.environ["psql_replicas"] = ""
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+# Все запросы бенчмарков идут с одного адреса
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import datetime
+import random
+import httpx
+from sqlalchemy import insert
+from core import database
+from core.database import Base, async_session_maker
+from core.hashing import bcrypt_hash
+from core.stats import rebuild_post_stats
+from core.rollups import backfill
+from models.users import User
+from models.posts import Post
+from models.reviews import Review
+from main import app
+
+PASSWORD = "benchmark-password"
+ADMIN_EMAIL = "user1@microblog.dev"
+BATCH_SIZE = 5000
+
+
+async def reset_database(reset: bool = False) -> None:
+    # drop_all на чужой базе необратим: не SQLite - только с явным --reset
+    url = database.engine.url
+    if url.get_backend_name() != "sqlite" and not reset:
+        raise RuntimeError(f"refusing to drop tables in {url!r}: "
+                           "BENCHMARK_DATABASE_URL is not SQLite, "
+                           "pass --reset to recreate it")
+    async with database.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def _insert(db, model, rows: list[dict]) -> None:
+    for start in range(0, len(rows), BATCH_SIZE):
+        await db.execute(insert(model), rows[start:start + BATCH_SIZE])
+
+
+async def seed(users: int = 50, posts: int = 1000, reviews: int = 5000,
+               seed_value: int = 42, reset: bool = False) -> None:
+    # Пользователь 1 - администратор, у всех один и тот же пароль PASSWORD
+    await reset_database(reset)
+    rnd = random.Random(seed_value)
+    now = datetime.datetime.now()
+    password = bcrypt_hash(PASSWORD)
+    async with async_session_maker() as db:
+        await _insert(db, User, [
+            {"id": i, "name": f"user{i}", "email": f"user{i}@microblog.dev",
+             "password": password, "date": now, "is_active": True,
+             "is_admin": i == 1}
+            for i in range(1, users + 1)])
+        await _insert(db, Post, [
+            {"id": i, "title": f"Post {i}", "text": f"Text of post {i}",
+             "date": now - datetime.timedelta(minutes=i),
+             "user_id": rnd.randint(1, users)}
+            for i in range(1, posts + 1)])
+        await _insert(db, Review, [
+            {"id": i, "comment": f"Review {i}", "grade": rnd.randint(1, 5),
+             "comment_date": now - datetime.timedelta(seconds=i),
+             "is_active": True, "post_id": rnd.randint(1, posts),
+             "user_id": rnd.randint(1, users)}
+            for i in range(1, reviews + 1)])
+        await rebuild_post_stats(db)
+        await db.commit()
+        await backfill(db)
+
+
+def open_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                             base_url="http://benchmark")
+
+
+async def login(client: httpx.AsyncClient, email: str = ADMIN_EMAIL) -> dict:
+    response = await client.post("/users/token", data={"username": email,
+                                                       "password": PASSWORD})
+    response.raise_for_status()
+    return response.json()
@@ -0,0 +1,80 @@
+from benchmarks.seed import seed
+
+import argparse
+import asyncio
+import time
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from core import database
+from core.database import async_session_maker
+from core.responses import fast_json
+from models.posts import Post
+from models.reviews import Review
+from models.schemas import PostBase, ReviewBase
+
+
+async def orm_path(model, schema) -> tuple[float, float]:
+    # Как было: сущности в identity map, валидация response_model
+    # и сериализация стандартным JSONResponse
+    adapter = TypeAdapter(list[schema])
+    started = time.perf_counter()
+    async with async_session_maker() as db:
+        items = (await db.scalars(select(model))).all()
+        loaded = time.perf_counter()
+        content = adapter.dump_python(
+            adapter.validate_python(items, from_attributes=True),
+            mode="json")
+        JSONResponse(content)
+    return loaded - started, time.perf_counter() - loaded
+
+
+async def lean_path(columns) -> tuple[float, float]:
+    # Как стало: кортежи только с колонками ответа и orjson
+    started = time.perf_counter()
+    async with async_session_maker() as db:
+        rows = (await db.execute(select(*columns))).all()
+        loaded = time.perf_counter()
+        fast_json([row._asdict() for row in rows])
+    return loaded - started, time.perf_counter() - loaded
+
+
+async def run(rows: int, repeat: int, reset: bool = False) -> None:
+    await seed(users=50, posts=rows, reviews=rows, reset=reset)
+    cases = [
+        ("posts", lambda: orm_path(Post, PostBase),
+         lambda: lean_path((Post.title, Post.text, Post.user_id))),
+        ("reviews", lambda: orm_path(Review, ReviewBase),
+         lambda: lean_path((Review.comment, Review.grade, Review.post_id,
+                            Review.user_id))),
+    ]
+    try:
+        print(f"{'case':<24} {'query, s':>9} {'json, s':>9} {'rows/s':>10}")
+        for name, before, after in cases:
+            for label, path in (("orm+pydantic", before),
+                                ("columns+orjson", after)):
+                # Лучший из нескольких прогонов, чтобы сгладить шум
+                query, encode = min([await path() for _ in range(repeat)],
+                                    key=sum)
+                print(f"{name + ' ' + label:<24} {query:9.3f} {encode:9.3f} "
+                      f"{rows / (query + encode):10.0f}")
+    finally:
+        await database.engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Сравнение скорости чтения и сериализации списков")
+    parser.add_argument("--rows", type=int, default=100_000,
+                        help="число постов и отзывов в базе")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="число прогонов каждого варианта")
+    parser.add_argument("--reset", action="store_true",
+                        help="разрешить пересоздать таблицы не в SQLite")
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.repeat, args.reset))
+
+
+if __name__ == "__main__":
+    # python -m benchmarks.serialization
+    main()
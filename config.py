@@ -1,4 +1,128 @@
 import os
 
+# Только окружение: .env загружают точки входа (main.py, migrations/env.py)
+
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
+
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", 50))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", 500))
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 1000))
+
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", 60))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", 10000))
+# Кэш пользователей сбрасывается при изменении только в своём процессе:
+# другие воркеры видят удаление или смену прав не позже чем через столько
+# секунд
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", 10))
+
+# Кэш ответов публичных списков; RESPONSE_CACHE_URL (redis://...) включает
+# общий для всех процессов кэш вместо кэша в памяти процесса
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 30))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 1000))
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "")
+
+# Число строк-счётчиков на ключ версии коллекции (ETag)
+VERSION_SHARDS = int(os.getenv("VERSION_SHARDS", 16))
+
+# Пул для bcrypt: "thread" или "process"
+HASH_POOL_KIND = os.getenv("HASH_POOL_KIND", "thread")
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", os.cpu_count() or 1))
+HASH_POOL_MAX_PENDING = int(os.getenv("HASH_POOL_MAX_PENDING", 64))
+
+# Ограничение частоты входа и регистрации (token bucket): BURST попыток
+# сразу, дальше PER_MINUTE в минуту отдельно на IP и на email.
+# RATE_LIMIT_URL (redis://...) - общие бакеты для всех процессов
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_URL = os.getenv("RATE_LIMIT_URL", "")
+RATE_LIMIT_SIZE = int(os.getenv("RATE_LIMIT_SIZE", 100000))
+RATE_LIMIT_IP_BURST = float(os.getenv("RATE_LIMIT_IP_BURST", 20))
+RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("RATE_LIMIT_IP_PER_MINUTE", 60))
+RATE_LIMIT_EMAIL_BURST = float(os.getenv("RATE_LIMIT_EMAIL_BURST", 5))
+RATE_LIMIT_EMAIL_PER_MINUTE = float(
+    os.getenv("RATE_LIMIT_EMAIL_PER_MINUTE", 5))
+
+# Групповой commit для POST /posts/ и POST /reviews/: вставки копятся
+# до WRITE_BATCH_MAX штук или WRITE_BATCH_DELAY_MS и пишутся одной
+# транзакцией. По умолчанию выключен
+WRITE_COALESCING = os.getenv("WRITE_COALESCING", "false").lower() == "true"
+WRITE_BATCH_MAX = int(os.getenv("WRITE_BATCH_MAX", 100))
+WRITE_BATCH_DELAY_MS = float(os.getenv("WRITE_BATCH_DELAY_MS", 5))
+
+# Живые обновления отзывов (/reviews/{post_id}/live): размер очереди
+# подписчика, после которого он отключается, и интервал keep-alive, сек.
+# PUBSUB_URL (redis://...) раздаёт события между воркерами
+PUBSUB_URL = os.getenv("PUBSUB_URL", "")
+PUBSUB_QUEUE_SIZE = int(os.getenv("PUBSUB_QUEUE_SIZE", 100))
+PUBSUB_HEARTBEAT = float(os.getenv("PUBSUB_HEARTBEAT", 15))
+
+# Окно пересчёта агрегатов отзывов по времени (python -m core.rollups), сутки
+ROLLUP_BACKFILL_DAYS = int(os.getenv("ROLLUP_BACKFILL_DAYS", 30))
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", 1000))
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", 100000))
+
+DATABASE_URL = os.getenv("psql")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
+# 0 - без ограничения
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))
+DB_LOCK_TIMEOUT_MS = int(os.getenv("DB_LOCK_TIMEOUT_MS", 0))
+
+# Реплики для чтения через запятую; пусто - всё читается с основной базы
+DATABASE_REPLICA_URLS = [url.strip() for url in
+                         os.getenv("psql_replicas", "").split(",")
+                         if url.strip()]
+# Сколько секунд после записи клиент читает с основной базы
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", 5))
+# Через сколько секунд снова пробовать недоступную реплику
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", 30))
+# Как часто проверять реплики SELECT 1 в фоне, сек
+REPLICA_CHECK_INTERVAL = float(os.getenv("REPLICA_CHECK_INTERVAL", 10))
+
+# Запросы дольше порога пишутся в лог; 0 - не логировать
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 0))
+
+# Как часто перечитывать внутрипроцессный поисковый индекс (SQLite), сек
+SEARCH_INDEX_REFRESH = int(os.getenv("SEARCH_INDEX_REFRESH", 300))
+
+# Авторы с таким числом подписчиков не раздаются по лентам при записи,
+# их посты подмешиваются при чтении
+FANOUT_THRESHOLD = int(os.getenv("FANOUT_THRESHOLD", 10000))
+FANOUT_BATCH_SIZE = int(os.getenv("FANOUT_BATCH_SIZE", 1000))
+# Сколько последних постов автора добавить в ленту при подписке
+FOLLOW_BACKFILL = int(os.getenv("FOLLOW_BACKFILL", 50))
+
+# Сколько строк удаляет одна транзакция фоновой очистки
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", 1000))
+# Аренда задачи очистки: воркер, не продливший её за это время, считается
+# упавшим, и задачу забирает другой
+PURGE_LEASE_SECONDS = int(os.getenv("PURGE_LEASE_SECONDS", 60))
+# Упавшая задача повторяется не раньше чем через PURGE_RETRY_SECONDS,
+# не больше PURGE_MAX_ATTEMPTS попыток всего
+PURGE_RETRY_SECONDS = int(os.getenv("PURGE_RETRY_SECONDS", 60))
+PURGE_MAX_ATTEMPTS = int(os.getenv("PURGE_MAX_ATTEMPTS", 5))
+# Как часто каждый воркер ищет незавершённые задачи, сек
+PURGE_RESUME_INTERVAL = int(os.getenv("PURGE_RESUME_INTERVAL", 60))
+
+# Скрытые модерацией отзывы старше стольких суток переносятся в архив
+REVIEW_ARCHIVE_AFTER_DAYS = int(os.getenv("REVIEW_ARCHIVE_AFTER_DAYS", 30))
+# Сколько отзывов переносит одна транзакция архивации
+REVIEW_ARCHIVE_BATCH_SIZE = int(os.getenv("REVIEW_ARCHIVE_BATCH_SIZE", 1000))
+
+# Прогрев при старте: сколько соединений открыть в пуле каждой базы
+# и какие GET-запросы выполнить, чтобы скомпилировать горячие запросы
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", DB_POOL_SIZE))
+WARMUP_PATHS = [path.strip() for path in
+                os.getenv("WARMUP_PATHS",
+                          "/posts/,/posts/?sort=rating,/reviews/").split(",")
+                if path.strip()]
+# После этого срока /health/ready отвечает 200, даже если прогрев не закончен
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", 30))
+# Сколько ждать SELECT 1 в /health/ready, сек
+READY_TIMEOUT = float(os.getenv("READY_TIMEOUT", 2))
@@ -0,0 +1,61 @@
+if __name__ == "__main__":
+    # Запуск скриптом: .env читается до импорта config, как в main.py
+    from dotenv import load_dotenv
+    load_dotenv()
+
+import asyncio
+import datetime
+from sqlalchemy import DateTime, delete, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import async_session_maker, init_engine
+from models.reviews import Review
+from models.reviews_archive import ReviewArchive
+import models.posts  # noqa: F401  регистрируют Post и User для relationship
+import models.users  # noqa: F401
+from config import REVIEW_ARCHIVE_AFTER_DAYS, REVIEW_ARCHIVE_BATCH_SIZE
+
+# Перенос давно скрытых отзывов в reviews_archive: горячая таблица и её
+# индексы остаются размером с активные отзывы. Статистику и агрегаты
+# не трогает - скрытые отзывы из них вычтены при деактивации
+
+ARCHIVE_COLUMNS = ("id", "comment", "comment_date", "grade", "is_active",
+                   "deactivated_at", "post_id", "user_id")
+
+
+async def archive_inactive(db: AsyncSession,
+                           after_days: int = REVIEW_ARCHIVE_AFTER_DAYS,
+                           batch_size: int = REVIEW_ARCHIVE_BATCH_SIZE
+                           ) -> int:
+    # Пачками по batch_size, INSERT ... SELECT и DELETE в одной транзакции:
+    # прерванный перенос можно просто запустить снова
+    cutoff = datetime.datetime.now() - datetime.timedelta(days=after_days)
+    moved = 0
+    while True:
+        ids = list(await db.scalars(
+            select(Review.id).where(~Review.is_active,
+                                    Review.deactivated_at < cutoff)
+            .order_by(Review.deactivated_at).limit(batch_size)))
+        if not ids:
+            return moved
+        now = datetime.datetime.now()
+        await db.execute(insert(ReviewArchive).from_select(
+            [*ARCHIVE_COLUMNS, "archived_at"],
+            select(*(getattr(Review, name) for name in ARCHIVE_COLUMNS),
+                   literal(now, DateTime)).where(Review.id.in_(ids))))
+        await db.execute(delete(Review).where(Review.id.in_(ids)))
+        await db.commit()
+        moved += len(ids)
+
+
+async def main() -> None:
+    engine = init_engine()
+    try:
+        async with async_session_maker() as db:
+            await archive_inactive(db)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    # Запускать по расписанию: python -m core.archive
+    asyncio.run(main())
@@ -0,0 +1,43 @@
+import json
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel, ValidationError
+from config import BULK_BATCH_SIZE, BULK_MAX_ITEMS
+
+
+async def read_bulk(request: Request, schema: type[BaseModel]
+                    ) -> tuple[list[tuple[int, BaseModel]], list[dict]]:
+    # Тело - JSON-массив или NDJSON (по строке на объект).
+    # Возвращает валидные элементы с их индексами и ошибки по остальным
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith(
+            "application/x-ndjson"):
+        raw_items = [line for line in body.splitlines() if line.strip()]
+        parse = schema.model_validate_json
+    else:
+        try:
+            raw_items = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail="Body must be a JSON array or NDJSON")
+        if not isinstance(raw_items, list):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                                detail="Body must be a JSON array or NDJSON")
+        parse = schema.model_validate
+    if len(raw_items) > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BULK_MAX_ITEMS} items per request")
+    valid, errors = [], []
+    for index, raw in enumerate(raw_items):
+        try:
+            valid.append((index, parse(raw)))
+        except ValidationError as exc:
+            errors.append({"index": index,
+                           "detail": exc.errors(include_url=False,
+                                                include_context=False)})
+    return valid, errors
+
+
+def batches(items: list, size: int = BULK_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
@@ -0,0 +1,278 @@
+import asyncio
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from urllib.parse import urlencode
+from fastapi import Request, Response
+from core.db_depends import read_session
+from core.replicas import pinned_to_primary
+from core.versions import conditional_response, version_headers
+from config import RESPONSE_CACHE_URL, RESPONSE_CACHE_TTL, RESPONSE_CACHE_SIZE
+
+
+class TTLCache:
+    # LRU-кэш с ограниченным размером и временем жизни записей.
+    # on_evict(key, value) вызывается, когда запись вытеснена или истекла
+    def __init__(self, maxsize: int, ttl: float,
+                 on_evict: Callable[[object, object], None] | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+
+    def _evicted(self, key, entry) -> None:
+        if self.on_evict is not None:
+            self.on_evict(key, entry[0])
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._data[key]
+                self._evicted(key, entry)
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key, value, ttl: float | None = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._evicted(*self._data.popitem(last=False))
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def items(self) -> list:
+        return [(key, entry[0]) for key, entry in self._data.items()]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    headers: dict[str, str]
+    media_type: str = "application/json"
+
+    def dumps(self) -> bytes:
+        return json.dumps({"body": self.body.decode(),
+                           "headers": self.headers,
+                           "media_type": self.media_type}).encode()
+
+    @classmethod
+    def loads(cls, raw: bytes) -> "CachedResponse":
+        data = json.loads(raw)
+        return cls(data["body"].encode(), data["headers"], data["media_type"])
+
+
+# Заголовки, которые хранятся вместе с телом ответа
+CACHED_HEADERS = ("ETag", "Last-Modified")
+
+
+class CacheBackend(ABC):
+    # Хранилище ответов: ключ -> CachedResponse, с инвалидацией по тегам
+    @abstractmethod
+    async def get(self, key: str) -> CachedResponse | None: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: CachedResponse,
+                  tags: tuple[str, ...]) -> None: ...
+
+    @abstractmethod
+    async def invalidate(self, *tags: str) -> None: ...
+
+
+class MemoryBackend(CacheBackend):
+    # Кэш внутри процесса; он же заменяет общий бэкенд при локальном запуске.
+    # Запись хранит свои теги: вытесненный или истёкший ключ уходит и из
+    # множеств тегов, и их размер ограничен размером кэша
+    def __init__(self, maxsize: int, ttl: float):
+        self.entries = TTLCache(maxsize, ttl, self._forget)
+        self._tags: dict[str, set[str]] = {}
+
+    def _forget(self, key: str, entry: tuple) -> None:
+        for tag in entry[1]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    async def get(self, key: str) -> CachedResponse | None:
+        entry = self.entries.get(key)
+        return None if entry is None else entry[0]
+
+    async def set(self, key: str, value: CachedResponse,
+                  tags: tuple[str, ...]) -> None:
+        old = self.entries.pop(key)
+        if old is not None:
+            self._forget(key, old)
+        self.entries.set(key, (value, tags))
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+    async def invalidate(self, *tags: str) -> None:
+        for tag in tags:
+            for key in list(self._tags.get(tag, ())):
+                entry = self.entries.pop(key)
+                if entry is not None:
+                    self._forget(key, entry)
+            self._tags.pop(tag, None)
+
+
+class RedisBackend(CacheBackend):
+    # Общий кэш для нескольких процессов. Принимает клиент redis.asyncio
+    # (или совместимую подделку); у каждого тега - множество его ключей
+    def __init__(self, client, ttl: float, prefix: str = "cache:"):
+        self.client = client
+        self.ttl_ms = int(ttl * 1000)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> CachedResponse | None:
+        raw = await self.client.get(self.prefix + key)
+        return None if raw is None else CachedResponse.loads(raw)
+
+    async def set(self, key: str, value: CachedResponse,
+                  tags: tuple[str, ...]) -> None:
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, value.dumps(), px=self.ttl_ms)
+        for tag in tags:
+            pipe.sadd(self.prefix + "tag:" + tag, key)
+            pipe.pexpire(self.prefix + "tag:" + tag, self.ttl_ms)
+        await pipe.execute()
+
+    async def invalidate(self, *tags: str) -> None:
+        tag_keys = [self.prefix + "tag:" + tag for tag in tags]
+        keys = set()
+        for tag_key in tag_keys:
+            keys |= await self.client.smembers(tag_key)
+        await self.client.delete(
+            *(self.prefix + (key.decode() if isinstance(key, bytes) else key)
+              for key in keys), *tag_keys)
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        # Одновременные промахи по одному ключу ждут один и тот же запрос
+        self._pending: dict[str, asyncio.Future] = {}
+        # Теги загрузок в полёте. Ответ, прочитанный до записи, не должен
+        # попасть в кэш после её инвалидации: такая загрузка помечается
+        # в _stale. Оба словаря не больше числа одновременных промахов
+        self._loading: dict[str, frozenset[str]] = {}
+        self._stale: set[str] = set()
+
+    @staticmethod
+    def key(request: Request) -> str:
+        params = sorted(request.query_params.multi_items())
+        return f"{request.url.path}?{urlencode(params)}"
+
+    @staticmethod
+    def _freeze(response: Response) -> CachedResponse:
+        return CachedResponse(
+            bytes(response.body),
+            {name: response.headers[name] for name in CACHED_HEADERS
+             if name in response.headers},
+            response.media_type)
+
+    async def _load(self, key: str, tags: tuple[str, ...],
+                    load: Callable[[], Awaitable[Response]]
+                    ) -> CachedResponse:
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Отменили запрос-загрузчик, а не нас: грузим сами
+                if not pending.cancelled():
+                    raise
+                return await self._load(key, tags, load)
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        self._loading[key] = frozenset(tags)
+        try:
+            cached = self._freeze(await load())
+            if key not in self._stale:
+                await self.backend.set(key, cached, tags)
+            future.set_result(cached)
+            return cached
+        except Exception as exc:
+            future.set_exception(exc)
+            # Ожидающих может не быть: помечаем исключение полученным
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            del self._pending[key]
+            del self._loading[key]
+            self._stale.discard(key)
+
+    async def serve(self, request: Request, tags: tuple[str, ...],
+                    load: Callable[[], Awaitable[Response]]) -> Response:
+        # load строит полный ответ с ETag/Last-Modified по версиям tags.
+        # Попадание и 304 по нему обходятся без базы. При промахе условный
+        # запрос сначала сверяется с версиями коллекций: 304 отдаётся до
+        # основного запроса. Клиент, закреплённый за основной базой после
+        # своей записи, кэш не читает
+        pinned = pinned_to_primary(request)
+        key = self.key(request)
+        cached = None if pinned else await self.backend.get(key)
+        if cached is not None:
+            self.hits += 1
+            status = "hit"
+        else:
+            if ("if-none-match" in request.headers
+                    or "if-modified-since" in request.headers):
+                async with read_session(request) as db:
+                    headers = await version_headers(db, *tags)
+                unchanged = conditional_response(request, headers)
+                if unchanged is not None:
+                    return unchanged
+            if pinned:
+                cached, status = self._freeze(await load()), "bypass"
+            else:
+                cached, status = await self._load(key, tags, load), "miss"
+        unchanged = conditional_response(request, cached.headers)
+        if unchanged is not None:
+            return unchanged
+        return Response(cached.body, media_type=cached.media_type,
+                        headers={**cached.headers, "X-Cache": status})
+
+    async def invalidate(self, *tags: str) -> None:
+        # Вызывать после commit с теми же ключами, что и bump_versions
+        for key, loading in self._loading.items():
+            if not loading.isdisjoint(tags):
+                self._stale.add(key)
+        await self.backend.invalidate(*tags)
+
+
+def _make_backend() -> CacheBackend:
+    if RESPONSE_CACHE_URL:
+        # redis - необязательная зависимость, нужна только общему кэшу
+        from redis.asyncio import Redis
+        return RedisBackend(Redis.from_url(RESPONSE_CACHE_URL),
+                            RESPONSE_CACHE_TTL)
+    return MemoryBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+
+response_cache = ResponseCache(_make_backend())
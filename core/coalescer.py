@@ -0,0 +1,129 @@
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import async_session_maker
+from core.metrics import Histogram, registry
+from config import WRITE_BATCH_MAX, WRITE_BATCH_DELAY_MS
+
+logger = logging.getLogger(__name__)
+
+batch_sizes = registry.register(Histogram(
+    "write_coalescer_batch_size", "Rows written per coalesced transaction",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)))
+batch_seconds = registry.register(Histogram(
+    "write_coalescer_flush_seconds",
+    "Time to write and commit one coalesced batch"))
+
+
+class WriteCoalescer:
+    # Групповой commit: одновременные вставки копятся до max_batch штук
+    # или max_delay секунд и пишутся одной транзакцией с многострочным
+    # INSERT ... RETURNING. Каждый запрос получает свою строку или ошибку.
+    #
+    # write(db, items) выполняется в транзакции и возвращает по элементу
+    # на каждый item в том же порядке: результат или исключение (для
+    # INSERT ... RETURNING - returning(sort_by_parameter_order=True));
+    # commit делает coalescer.
+    # after_commit вызывается после commit до ответа клиентам (инвалидация
+    # кэша), background - уже после ответа (раздача по лентам)
+    def __init__(self, name: str,
+                 write: Callable[[AsyncSession, list], Awaitable[list]],
+                 after_commit: Callable[[list], Awaitable[None]] | None = None,
+                 background: Callable[[list], Awaitable[None]] | None = None,
+                 max_batch: int = WRITE_BATCH_MAX,
+                 max_delay: float = WRITE_BATCH_DELAY_MS / 1000):
+        self.name = name
+        self.write = write
+        self.after_commit = after_commit
+        self.background = background
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.fallbacks = 0
+        self._batch: list[tuple[object, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        self._batch.append((item, future))
+        if len(self._batch) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.max_delay, self._flush)
+        # Отмена запроса не отменяет запись: строка уже в пачке
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._batch = self._batch, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _write(self, db: AsyncSession, items: list) -> list:
+        try:
+            results = await self.write(db, items)
+            await db.commit()
+            return results
+        except Exception as exc:
+            await db.rollback()
+            if len(items) == 1:
+                return [exc]
+        # Пачка упала целиком (например, нарушение внешнего ключа в одной
+        # строке): пишем по одной в точках сохранения той же транзакции,
+        # чтобы ошибку получил только виновный запрос
+        self.fallbacks += 1
+        results = []
+        for item in items:
+            try:
+                async with db.begin_nested():
+                    results += await self.write(db, [item])
+            except Exception as exc:
+                results.append(exc)
+        await db.commit()
+        return results
+
+    async def _run(self, batch: list[tuple[object, asyncio.Future]]) -> None:
+        items = [item for item, _ in batch]
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            async with async_session_maker() as db:
+                results = await self._write(db, items)
+        except Exception as exc:
+            logger.exception("Coalesced %s write failed", self.name)
+            results = [exc] * len(batch)
+        written = [result for result in results
+                   if not isinstance(result, Exception)]
+        if written and self.after_commit is not None:
+            try:
+                await self.after_commit(written)
+            except Exception:
+                logger.exception("Coalesced %s after-commit step failed",
+                                 self.name)
+        batch_sizes.observe(len(batch), writer=self.name)
+        batch_seconds.observe(loop.time() - start, writer=self.name)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+        if written and self.background is not None:
+            try:
+                await self.background(written)
+            except Exception:
+                logger.exception("Coalesced %s background step failed",
+                                 self.name)
+
+    async def stop(self) -> None:
+        # Дописать накопленное при остановке процесса
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -1,17 +1,102 @@
-import os
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import DeclarativeBase
-from dotenv import load_dotenv
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.ext.asyncio import (create_async_engine, async_sessionmaker,
+                                    AsyncEngine, AsyncSession)
+from core.metrics import Histogram, registry
+from config import (DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW,
+                    DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+                    DB_STATEMENT_CACHE_SIZE, DB_STATEMENT_TIMEOUT_MS,
+                    DB_LOCK_TIMEOUT_MS)
 
-load_dotenv()
 
-DATABASE_URL = os.getenv('psql')
+pool_wait = registry.register(Histogram(
+    "db_pool_acquire_seconds",
+    "Time spent waiting for a pooled database connection"))
+pool_timeouts = 0
 
-engine = create_async_engine(DATABASE_URL)
 
-async_session_maker = async_sessionmaker(autocommit=False,
-                                         autoflush=False, bind=engine)
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    # Ожидание соединения меряется в самом пуле: сессии берут соединение
+    # лениво, при первом запросе, и ответ из кэша пул не трогает
+    def _do_get(self):
+        global pool_timeouts
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_timeouts += 1
+            raise
+        finally:
+            pool_wait.observe(time.perf_counter() - start)
+
+
+def engine_options(url: str) -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING,
+               "pool_recycle": DB_POOL_RECYCLE}
+    # Тот же класс, что диалект выбрал бы сам, кроме SQLite в памяти
+    if ":memory:" not in url:
+        options["poolclass"] = TimedQueuePool
+    # Для SQLite (локальный запуск, бенчмарки) пул подбирает сам диалект
+    if not url.startswith("sqlite"):
+        options.update(pool_size=DB_POOL_SIZE,
+                       max_overflow=DB_MAX_OVERFLOW,
+                       pool_timeout=DB_POOL_TIMEOUT)
+    if url.startswith("postgresql+asyncpg"):
+        server_settings = {}
+        if DB_STATEMENT_TIMEOUT_MS:
+            server_settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+        if DB_LOCK_TIMEOUT_MS:
+            server_settings["lock_timeout"] = str(DB_LOCK_TIMEOUT_MS)
+        options["connect_args"] = {
+            "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "server_settings": server_settings}
+    return options
+
+
+def count_pool_events(target,
+                      counters: dict[str, int] | None = None
+                      ) -> dict[str, int]:
+    # Счётчики событий пула: новые соединения, выдачи, инвалидации
+    if counters is None:
+        counters = {"connect": 0, "checkout": 0, "checkin": 0,
+                    "invalidate": 0}
+    for name in counters:
+        def listener(*args, name=name):
+            counters[name] += 1
+        event.listen(target, name, listener)
+    return counters
+
+
+# Движок создаёт init_engine из фабрики приложения или скрипта, а не
+# импорт модуля; до этого сессии не к чему привязать
+engine: AsyncEngine | None = None
+pool_events = {"connect": 0, "checkout": 0, "checkin": 0, "invalidate": 0}
+
+async_session_maker = async_sessionmaker(autocommit=False, autoflush=False)
+
+
+def init_engine(url: str | None = DATABASE_URL) -> AsyncEngine:
+    global engine
+    if engine is None:
+        if not url:
+            raise RuntimeError("psql is not set: export the database URL "
+                               "or put it in .env")
+        engine = create_async_engine(url, **engine_options(url))
+        count_pool_events(engine.sync_engine, pool_events)
+        async_session_maker.configure(bind=engine)
+    return engine
 
 
 class Base(DeclarativeBase):
     pass
+
+
+def upsert(db: AsyncSession, table):
+    # INSERT ... ON CONFLICT есть и в PostgreSQL, и в SQLite
+    if db.bind.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
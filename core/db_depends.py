@@ -1,8 +1,69 @@
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import asynccontextmanager
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession
 from core.database import async_session_maker
+from core.replicas import replica_set, pinned_to_primary
+from config import WRITE_COALESCING
+
+
+async def pool_timeout_handler(request: Request,
+                               exc: PoolTimeoutError) -> JSONResponse:
+    # Соединение берётся при первом запросе обработчика, поэтому
+    # pool_timeout превращается в 503 здесь, а не в зависимости
+    return JSONResponse({"detail": "Database is busy, try again later"},
+                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        headers={"Retry-After": "1"})
+
+
+@asynccontextmanager
+async def primary_session() -> AsyncIterator[AsyncSession]:
+    # Соединение из пула - при первом запросе, не при входе
+    async with async_session_maker() as session:
+        yield session
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with primary_session() as session:
+        yield session
+
+
+async def get_create_db() -> AsyncGenerator[AsyncSession | None, None]:
+    # С групповым commit POST /posts/ и /reviews/ не держат соединение,
+    # пока ждут пачку: пишет coalescer своей сессией
+    if WRITE_COALESCING:
+        yield None
+        return
+    async with primary_session() as session:
+        yield session
+
+
+@asynccontextmanager
+async def read_session(request: Request) -> AsyncIterator[AsyncSession]:
+    # Только для чтения: реплика, если клиент недавно ничего не записывал.
+    # Недоступная реплика помечается упавшей, запрос уходит в основную базу
+    index = None if pinned_to_primary(request) else replica_set.pick()
+    if index is not None:
+        session = replica_set.session_makers[index]()
+        try:
+            # Реплику проверяем сразу: после yield вернуться
+            # к основной базе уже нельзя
+            await session.connection()
+        except (DBAPIError, OSError, PoolTimeoutError):
+            await session.close()
+            replica_set.mark_down(index)
+        else:
+            replica_set.reads[index] += 1
+            async with session:
+                yield session
+            return
+    replica_set.primary_reads += 1
     async with async_session_maker() as session:
         yield session
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    async with read_session(request) as session:
+        yield session
@@ -0,0 +1,56 @@
+import csv
+import io
+import json
+from collections.abc import AsyncIterator
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from core.database import async_session_maker
+from config import EXPORT_CHUNK_SIZE
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _ndjson_chunk(rows) -> str:
+    return "".join(json.dumps(row._asdict(), default=str, ensure_ascii=False)
+                   + "\n" for row in rows)
+
+
+def _csv_chunk(rows, header: list[str] | None = None) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header is not None:
+        writer.writerow(header)
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+async def _stream_rows(query: Select, fmt: str,
+                       session_maker: async_sessionmaker
+                       ) -> AsyncIterator[str]:
+    # Собственная сессия: она должна жить, пока клиент читает ответ,
+    # а серверный курсор отдаёт строки пачками по EXPORT_CHUNK_SIZE
+    async with session_maker() as session:
+        result = await session.stream(
+            query.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        header = list(result.keys())
+        if fmt == "csv":
+            yield _csv_chunk([], header)
+        async for rows in result.partitions():
+            if fmt == "csv":
+                yield _csv_chunk(rows)
+            else:
+                yield _ndjson_chunk(rows)
+
+
+def export_response(query: Select, fmt: str, filename: str,
+                    session_maker: async_sessionmaker = async_session_maker
+                    ) -> StreamingResponse:
+    return StreamingResponse(
+        _stream_rows(query, fmt, session_maker),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition":
+                 f'attachment; filename="{filename}.{fmt}"'})
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from core.timing import add_timing
+from config import HASH_POOL_KIND, HASH_POOL_WORKERS, HASH_POOL_MAX_PENDING
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def bcrypt_hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def bcrypt_verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+class HashingPool:
+    # Выносит bcrypt из event loop и ограничивает очередь ожидающих задач
+    def __init__(self, kind: str, workers: int, max_pending: int):
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+        self.max_latency = 0.0
+        self._executor: Executor | None = None
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.in_flight - self.workers)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def run(self, func, *args):
+        if self.queue_depth >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, try again later",
+                headers={"Retry-After": "1"})
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            result, run_time = await asyncio.get_running_loop(
+                ).run_in_executor(self._get_executor(), _timed, func, *args)
+        finally:
+            self.in_flight -= 1
+        latency = time.perf_counter() - start
+        add_timing("hash", latency)
+        self.completed += 1
+        self.run_seconds += run_time
+        self.wait_seconds += latency - run_time
+        self.max_latency = max(self.max_latency, latency)
+        return result
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hashing_pool = HashingPool(HASH_POOL_KIND, HASH_POOL_WORKERS,
+                           HASH_POOL_MAX_PENDING)
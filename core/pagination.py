@@ -0,0 +1,40 @@
+import base64
+import binascii
+import datetime
+import json
+from fastapi import HTTPException, status
+from config import PAGE_SIZE_MAX
+
+
+def clamp_limit(limit: int) -> int:
+    return min(limit, PAGE_SIZE_MAX)
+
+
+def encode_cursor(*values) -> str:
+    # Курсор непрозрачен для клиента: base64 от JSON-массива ключа сортировки
+    raw = json.dumps([value.isoformat()
+                      if isinstance(value, datetime.datetime) else value
+                      for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(cursor)
+        return tuple(datetime.datetime.fromisoformat(value)
+                     if type_ is datetime.datetime else type_(value)
+                     for type_, value in zip(types, values))
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Invalid cursor")
+
+
+def keyset_page(rows: list, limit: int, key) -> tuple[list, str | None]:
+    # Запрашиваем limit + 1 строк: лишняя строка означает, что есть следующая страница
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
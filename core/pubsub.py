@@ -0,0 +1,198 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from config import PUBSUB_URL, PUBSUB_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Сообщения - уже сериализованные bytes: кодируются один раз на публикацию,
+# подписчикам раздаётся один и тот же объект
+
+
+class Subscription:
+    # Очередь одного подписчика. None в очереди - сигнал закрыть
+    # соединение: подписчик не успевал читать и был отключён
+    def __init__(self, topic: str, maxsize: int):
+        self.topic = topic
+        self.queue: asyncio.Queue[bytes | None] = asyncio.Queue(maxsize)
+        self.dropped = False
+
+    async def get(self) -> bytes | None:
+        return await self.queue.get()
+
+
+class BroadcastBackend(ABC):
+    # Доставка между процессами: publish отправляет сообщение всем
+    # воркерам, включая текущий, а те вызывают deliver(topic, message)
+    @abstractmethod
+    async def start(self, deliver: Callable[[str, bytes], None]) -> None: ...
+
+    @abstractmethod
+    async def publish(self, topic: str, message: bytes) -> None: ...
+
+    async def publish_many(self, messages: list[tuple[str, bytes]]) -> None:
+        for topic, message in messages:
+            await self.publish(topic, message)
+
+    @abstractmethod
+    async def stop(self) -> None: ...
+
+
+class LocalBroadcast(BroadcastBackend):
+    # Один процесс: публикация сразу раздаётся локальным подписчикам
+    async def start(self, deliver: Callable[[str, bytes], None]) -> None:
+        self.deliver = deliver
+
+    async def publish(self, topic: str, message: bytes) -> None:
+        self.deliver(topic, message)
+
+    async def stop(self) -> None:
+        pass
+
+
+class RedisBroadcast(BroadcastBackend):
+    # Несколько воркеров через Redis PUBLISH. Один PSUBSCRIBE на процесс,
+    # а не по каналу на тему: число подписчиков Redis не видит
+    def __init__(self, client, prefix: str = "pubsub:",
+                 batch_size: int = 1000):
+        self.client = client
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self._pubsub = None
+        self._listener: asyncio.Task | None = None
+
+    async def start(self, deliver: Callable[[str, bytes], None]) -> None:
+        self._pubsub = self.client.pubsub()
+        await self._pubsub.psubscribe(self.prefix + "*")
+        self._listener = asyncio.create_task(self._listen(deliver))
+
+    async def _listen(self, deliver: Callable[[str, bytes], None]) -> None:
+        async for message in self._pubsub.listen():
+            if message["type"] != "pmessage":
+                continue
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            deliver(channel[len(self.prefix):], message["data"])
+
+    async def publish(self, topic: str, message: bytes) -> None:
+        await self.client.publish(self.prefix + topic, message)
+
+    async def publish_many(self, messages: list[tuple[str, bytes]]) -> None:
+        # Пачка PUBLISH одним pipeline - один round trip на batch_size
+        # сообщений, а не на каждое
+        for start in range(0, len(messages), self.batch_size):
+            pipe = self.client.pipeline(transaction=False)
+            for topic, message in messages[start:start + self.batch_size]:
+                pipe.publish(self.prefix + topic, message)
+            await pipe.execute()
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+
+
+class PubSubHub:
+    # Подписчики по темам внутри процесса. Простаивающий подписчик - это
+    # только пустая очередь; медленный, чья очередь переполнилась,
+    # отключается, чтобы не копить память и не тормозить остальных
+    def __init__(self, backend: BroadcastBackend, queue_size: int):
+        self.backend = backend
+        self.queue_size = queue_size
+        self.topics: dict[str, set[Subscription]] = {}
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self._started: asyncio.Task | None = None
+
+    @property
+    def subscribers(self) -> int:
+        return sum(len(subscriptions)
+                   for subscriptions in self.topics.values())
+
+    async def start(self) -> None:
+        # Ленивый старт: приложение может работать и без lifespan
+        if self._started is None:
+            self._started = asyncio.ensure_future(
+                self.backend.start(self._deliver))
+        started = self._started
+        try:
+            await asyncio.shield(started)
+        except Exception:
+            # Неудачный старт не запоминается: следующий вызов попробует снова
+            if self._started is started:
+                self._started = None
+            raise
+
+    async def stop(self) -> None:
+        if self._started is not None:
+            self._started = None
+            await self.backend.stop()
+
+    @contextmanager
+    def subscribe(self, topic: str) -> Iterator[Subscription]:
+        subscription = Subscription(topic, self.queue_size)
+        self.topics.setdefault(topic, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            self._remove(subscription)
+
+    def _remove(self, subscription: Subscription) -> None:
+        subscriptions = self.topics.get(subscription.topic)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self.topics[subscription.topic]
+
+    async def publish(self, topic: str, message: bytes) -> None:
+        # Вызывать после commit
+        self.published += 1
+        try:
+            await self.start()
+            await self.backend.publish(topic, message)
+        except Exception:
+            # Живые обновления - не повод ронять запись, которая уже прошла
+            logger.exception("Publish to %s failed", topic)
+
+    async def publish_many(self, messages: list[tuple[str, bytes]]) -> None:
+        # То же для пачки сообщений, например после массовой вставки
+        if not messages:
+            return
+        self.published += len(messages)
+        try:
+            await self.start()
+            await self.backend.publish_many(messages)
+        except Exception:
+            logger.exception("Publish of %d messages failed", len(messages))
+
+    def _deliver(self, topic: str, message: bytes) -> None:
+        for subscription in list(self.topics.get(topic, ())):
+            try:
+                subscription.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                subscription.dropped = True
+                self._remove(subscription)
+                # Место под сигнал закрытия: старые сообщения уже не нужны
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.queue.put_nowait(None)
+            else:
+                self.delivered += 1
+
+
+def _make_backend() -> BroadcastBackend:
+    if PUBSUB_URL:
+        # redis - необязательная зависимость, нужна только между воркерами
+        from redis.asyncio import Redis
+        return RedisBroadcast(Redis.from_url(PUBSUB_URL))
+    return LocalBroadcast()
+
+
+hub = PubSubHub(_make_backend(), PUBSUB_QUEUE_SIZE)
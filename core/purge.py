@@ -0,0 +1,244 @@
+if __name__ == "__main__":
+    # Запуск скриптом: .env читается до импорта config, как в main.py
+    from dotenv import load_dotenv
+    load_dotenv()
+
+import asyncio
+import datetime
+import logging
+import os
+import socket
+from sqlalchemy import and_, delete, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.cache import response_cache
+from core.database import async_session_maker, init_engine
+from core.stats import apply_review_deltas
+from core.rollups import apply_rollup_deltas
+from core.search import search_index
+from core.versions import bump_versions, post_reviews_key
+from models.follows import Follow
+from models.post_stats import PostStats
+from models.posts import Post
+from models.purge_jobs import PurgeJob
+from models.review_rollups import PostReviewRollup
+from models.reviews import Review
+from models.reviews_archive import ReviewArchive
+from models.timelines import TimelineEntry
+from models.users import User
+from config import (PURGE_BATCH_SIZE, PURGE_LEASE_SECONDS,
+                    PURGE_RETRY_SECONDS, PURGE_MAX_ATTEMPTS,
+                    PURGE_RESUME_INTERVAL)
+
+logger = logging.getLogger(__name__)
+
+# Удаление аккаунта или поста в два этапа: обработчик помечает одну строку
+# deleted_at (чтение скрывает зависимые через core.visibility) и создаёт
+# задачу, а run_purge удаляет зависимые строки
+# пачками по PURGE_BATCH_SIZE, по транзакции на пачку. ON DELETE CASCADE
+# в схеме - страховка на случай, если что-то добавится мимо очистки
+
+
+# Владелец аренды: процесс, который выполняет задачу
+OWNER = f"{socket.gethostname()}:{os.getpid()}"[:64]
+
+
+class LeaseLost(Exception):
+    # Аренду забрал другой воркер: текущая пачка откатывается
+    pass
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now()
+
+
+def _lease() -> datetime.datetime:
+    return _now() + datetime.timedelta(seconds=PURGE_LEASE_SECONDS)
+
+
+def _claimable(now: datetime.datetime):
+    # Новая задача, упавшая с оставшимися попытками (не чаще раза в
+    # PURGE_RETRY_SECONDS) или выполняемая воркером с истёкшей арендой
+    retry_after = now - datetime.timedelta(seconds=PURGE_RETRY_SECONDS)
+    return or_(PurgeJob.status == "pending",
+               and_(PurgeJob.status == "failed",
+                    PurgeJob.attempts < PURGE_MAX_ATTEMPTS,
+                    PurgeJob.updated_at < retry_after),
+               and_(PurgeJob.status == "running",
+                    PurgeJob.lease_until < now))
+
+
+async def create_job(db: AsyncSession, kind: str, target_id: int) -> int:
+    # В транзакции пометки, commit делает обработчик
+    job = PurgeJob(kind=kind, target_id=target_id, status="pending")
+    db.add(job)
+    await db.flush()
+    return job.id
+
+
+async def _delete_batch(db: AsyncSession, model, condition, *returning):
+    # DELETE по первичному ключу из подзапроса с LIMIT: так одна
+    # транзакция трогает не больше PURGE_BATCH_SIZE строк
+    key = tuple(model.__table__.primary_key.columns)
+    target = key[0] if len(key) == 1 else tuple_(*key)
+    stmt = delete(model).where(target.in_(
+        select(*key).where(condition).limit(PURGE_BATCH_SIZE))
+    ).execution_options(synchronize_session=False)
+    if returning:
+        return (await db.execute(stmt.returning(*returning))).all()
+    return (await db.execute(stmt)).rowcount
+
+
+async def _progress(db: AsyncSession, job_id: int, *keys: str,
+                    **counters: int) -> None:
+    # Счётчики задачи фиксируются в той же транзакции, что и пачка,
+    # заодно продлевается аренда
+    values = {name: getattr(PurgeJob, name) + count
+              for name, count in counters.items()}
+    result = await db.execute(update(PurgeJob).where(
+        PurgeJob.id == job_id, PurgeJob.owner == OWNER).values(
+            updated_at=_now(), lease_until=_lease(), **values))
+    if result.rowcount == 0:
+        raise LeaseLost(job_id)
+    if keys:
+        await bump_versions(db, *keys)
+    await db.commit()
+    if keys:
+        await response_cache.invalidate(*keys)
+
+
+async def _purge_reviews(db: AsyncSession, job_id: int, condition) -> None:
+    while True:
+        rows = await _delete_batch(db, Review, condition, Review.post_id,
+                                   Review.grade, Review.comment_date,
+                                   Review.is_active)
+        if not rows:
+            return
+        # Скрытые отзывы из статистики уже вычтены
+        active = [row for row in rows if row.is_active]
+        deltas = {}
+        for row in active:
+            count, grade = deltas.get(row.post_id, (0, 0))
+            deltas[row.post_id] = (count - 1, grade - row.grade)
+        await apply_review_deltas(db, deltas)
+        await apply_rollup_deltas(db, [(row.comment_date, row.post_id,
+                                        row.grade) for row in active], -1)
+        await _progress(db, job_id, "reviews",
+                        *{post_reviews_key(row.post_id) for row in rows},
+                        reviews_deleted=len(rows))
+
+
+async def _purge_rows(db: AsyncSession, job_id: int, model,
+                      condition) -> None:
+    while await _delete_batch(db, model, condition):
+        await _progress(db, job_id)
+
+
+async def _purge_posts(db: AsyncSession, job_id: int, post_ids: list[int]
+                       ) -> None:
+    await _purge_reviews(db, job_id, Review.post_id.in_(post_ids))
+    await _purge_rows(db, job_id, TimelineEntry,
+                      TimelineEntry.post_id.in_(post_ids))
+    await _purge_rows(db, job_id, ReviewArchive,
+                      ReviewArchive.post_id.in_(post_ids))
+    await db.execute(delete(PostStats).where(
+        PostStats.post_id.in_(post_ids)))
+    await db.execute(delete(PostReviewRollup).where(
+        PostReviewRollup.post_id.in_(post_ids)))
+    await db.execute(delete(Post).where(Post.id.in_(post_ids)))
+    await _progress(db, job_id, posts_deleted=len(post_ids))
+    for post_id in post_ids:
+        search_index.remove(post_id)
+
+
+async def _purge_user(db: AsyncSession, job_id: int, user_id: int) -> None:
+    await _purge_reviews(db, job_id, Review.user_id == user_id)
+    await _purge_rows(db, job_id, ReviewArchive,
+                      ReviewArchive.user_id == user_id)
+    while True:
+        post_ids = list(await db.scalars(select(Post.id).where(
+            Post.user_id == user_id).limit(PURGE_BATCH_SIZE)))
+        if not post_ids:
+            break
+        await _purge_posts(db, job_id, post_ids)
+    # Подписки пользователя: уменьшаем счётчики тех, на кого он подписан
+    while True:
+        followees = [row.followee_id for row in await _delete_batch(
+            db, Follow, Follow.follower_id == user_id, Follow.followee_id)]
+        if not followees:
+            break
+        await db.execute(update(User).where(User.id.in_(followees)).values(
+            follower_count=User.follower_count - 1))
+        await _progress(db, job_id)
+    await _purge_rows(db, job_id, Follow, Follow.followee_id == user_id)
+    await _purge_rows(db, job_id, TimelineEntry,
+                      TimelineEntry.user_id == user_id)
+    await db.execute(delete(User).where(User.id == user_id))
+    await _progress(db, job_id)
+
+
+async def run_purge(job_id: int) -> None:
+    # Фоновая задача со своей сессией. Задачу забирает условный UPDATE:
+    # из нескольких воркеров выполнять её будет один. Повторный запуск
+    # безопасен - каждая пачка удаляет то, что ещё осталось
+    async with async_session_maker() as db:
+        now = _now()
+        job = (await db.execute(
+            update(PurgeJob).where(PurgeJob.id == job_id, _claimable(now))
+            .values(status="running", owner=OWNER, lease_until=_lease(),
+                    attempts=PurgeJob.attempts + 1, updated_at=now)
+            .returning(PurgeJob.kind, PurgeJob.target_id))).first()
+        await db.commit()
+        if job is None:
+            return
+        try:
+            if job.kind == "user":
+                await _purge_user(db, job_id, job.target_id)
+            else:
+                await _purge_posts(db, job_id, [job.target_id])
+        except LeaseLost:
+            logger.warning("Purge job %s was taken over", job_id)
+            await db.rollback()
+            return
+        except Exception as exc:
+            logger.exception("Purge job %s failed", job_id)
+            await db.rollback()
+            values = {"status": "failed", "error": str(exc)[:1000]}
+        else:
+            values = {"status": "done", "finished_at": _now()}
+        await db.execute(update(PurgeJob).where(PurgeJob.id == job_id,
+                                                PurgeJob.owner == OWNER)
+                         .values(updated_at=_now(), lease_until=None,
+                                 **values))
+        await db.commit()
+
+
+async def resume_pending_purges() -> None:
+    # Новые, брошенные упавшим воркером и упавшие с оставшимися попытками
+    async with async_session_maker() as db:
+        job_ids = list(await db.scalars(select(PurgeJob.id).where(
+            _claimable(_now())).order_by(PurgeJob.id)))
+    for job_id in job_ids:
+        await run_purge(job_id)
+
+
+async def purge_worker() -> None:
+    # Фоновый цикл в каждом воркере: задачи делятся через аренду
+    while True:
+        try:
+            await resume_pending_purges()
+        except Exception:
+            logger.exception("Purge resume failed")
+        await asyncio.sleep(PURGE_RESUME_INTERVAL)
+
+
+async def main() -> None:
+    engine = init_engine()
+    try:
+        await resume_pending_purges()
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    # Дочистить незавершённые задачи вручную: python -m core.purge
+    asyncio.run(main())
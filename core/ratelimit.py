@@ -0,0 +1,153 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from dataclasses import dataclass
+from fastapi import HTTPException, Request, status
+from core.cache import TTLCache
+from config import (RATE_LIMIT_ENABLED, RATE_LIMIT_URL, RATE_LIMIT_SIZE,
+                    RATE_LIMIT_IP_BURST, RATE_LIMIT_IP_PER_MINUTE,
+                    RATE_LIMIT_EMAIL_BURST, RATE_LIMIT_EMAIL_PER_MINUTE)
+
+# Token bucket перед входом и регистрацией: попытка отклоняется с 429
+# до запроса в базу и до bcrypt, который и есть дорогая часть
+
+
+@dataclass(frozen=True)
+class Bucket:
+    capacity: float
+    per_second: float
+
+    @property
+    def refill_seconds(self) -> float:
+        # За это время пустой бакет наполняется целиком
+        return self.capacity / self.per_second
+
+
+class RateLimitBackend(ABC):
+    # Списывает токен; возвращает 0, если попытка разрешена,
+    # иначе через сколько секунд появится следующий токен
+    @abstractmethod
+    async def take(self, key: str, bucket: Bucket) -> float: ...
+
+
+class MemoryBackend(RateLimitBackend):
+    # Бакеты внутри процесса. Полный бакет не хранится: запись живёт
+    # не дольше времени наполнения, и размер таблицы ограничен
+    def __init__(self, maxsize: int):
+        self.buckets = TTLCache(maxsize, 0)
+
+    async def take(self, key: str, bucket: Bucket) -> float:
+        now = time.monotonic()
+        tokens, updated = self.buckets.get(key, (bucket.capacity, now))
+        tokens = min(bucket.capacity,
+                     tokens + (now - updated) * bucket.per_second)
+        if tokens < 1:
+            self.buckets.set(key, (tokens, now), bucket.refill_seconds)
+            return (1 - tokens) / bucket.per_second
+        self.buckets.set(key, (tokens - 1, now), bucket.refill_seconds)
+        return 0.0
+
+
+# Списание атомарно на стороне Redis: несколько процессов делят бакет
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - updated) * rate)
+local wait = 0
+if tokens < 1 then
+    wait = (1 - tokens) / rate
+else
+    tokens = tokens - 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens),
+           'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisBackend(RateLimitBackend):
+    # Общие бакеты для нескольких процессов. Принимает клиент
+    # redis.asyncio (или совместимую подделку)
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def take(self, key: str, bucket: Bucket) -> float:
+        wait = await self.client.eval(_TAKE_SCRIPT, 1, self.prefix + key,
+                                      bucket.capacity, bucket.per_second)
+        return float(wait)
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend, ip_bucket: Bucket,
+                 email_bucket: Bucket):
+        self.backend = backend
+        self.ip_bucket = ip_bucket
+        self.email_bucket = email_bucket
+        # (эндпоинт, результат) -> число попыток
+        self.counts: Counter = Counter()
+
+    async def check(self, scope: str, ip: str, email: str | None) -> None:
+        # Бакет адреса общий для входа и регистрации - оба тратят bcrypt.
+        # Бакет email - свой у каждого эндпоинта: перебор паролей к одному
+        # аккаунту с разных адресов тоже упирается в лимит
+        checks = [("ip", f"ip:{ip}", self.ip_bucket)]
+        if email:
+            checks.append(("email", f"{scope}:email:{email.strip().lower()}",
+                           self.email_bucket))
+        for kind, key, bucket in checks:
+            wait = await self.backend.take(key, bucket)
+            if wait > 0:
+                self.counts[scope, f"rejected_{kind}"] += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many attempts, try again later",
+                    headers={"Retry-After": str(math.ceil(wait))})
+        self.counts[scope, "admitted"] += 1
+
+
+def _make_backend() -> RateLimitBackend:
+    if RATE_LIMIT_URL:
+        # redis - необязательная зависимость, нужна только общим бакетам
+        from redis.asyncio import Redis
+        return RedisBackend(Redis.from_url(RATE_LIMIT_URL))
+    return MemoryBackend(RATE_LIMIT_SIZE)
+
+
+rate_limiter = RateLimiter(
+    _make_backend(),
+    Bucket(RATE_LIMIT_IP_BURST, RATE_LIMIT_IP_PER_MINUTE / 60),
+    Bucket(RATE_LIMIT_EMAIL_BURST, RATE_LIMIT_EMAIL_PER_MINUTE / 60))
+
+
+async def _target_email(request: Request) -> str | None:
+    # Тело уже прочитано FastAPI и закэшировано в request, повторного
+    # чтения из сокета нет. Форма входа - username, JSON регистрации - email
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("application/json"):
+            data = await request.json()
+            email = data.get("email") if isinstance(data, dict) else None
+        else:
+            email = (await request.form()).get("username")
+    except ValueError:
+        return None
+    return email if isinstance(email, str) else None
+
+
+def throttle(scope: str):
+    # Зависимость объявляется в эндпоинте раньше get_db, чтобы отказ
+    # случился до соединения с базой
+    async def dependency(request: Request) -> None:
+        if not RATE_LIMIT_ENABLED:
+            return
+        ip = request.client.host if request.client else "unknown"
+        await rate_limiter.check(scope, ip, await _target_email(request))
+    return dependency
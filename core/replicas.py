@@ -0,0 +1,149 @@
+import asyncio
+import hashlib
+import hmac
+import itertools
+import logging
+import math
+import time
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import (create_async_engine, async_sessionmaker,
+                                    AsyncEngine)
+from core.database import (engine_options, async_session_maker,
+                           count_pool_events)
+from config import (DATABASE_REPLICA_URLS, REPLICA_STICKY_SECONDS,
+                    REPLICA_RETRY_SECONDS, SECRET_KEY)
+
+logger = logging.getLogger(__name__)
+
+# Метка "читать с основной базы до" (unix time с подписью): клиент
+# получает её в cookie и в заголовке и может вернуть любым из двух способов
+PRIMARY_COOKIE = "primary_until"
+PRIMARY_HEADER = "X-Primary-Until"
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class ReplicaSet:
+    def __init__(self, urls: list[str], retry_seconds: float):
+        # Движки создаёт open() вместе с основным; до этого все чтения
+        # идут в основную базу
+        self.urls = urls
+        self.engines = []
+        self.pool_events = []
+        self.session_makers = []
+        self.retry_seconds = retry_seconds
+        self.down_until = [0.0] * len(urls)
+        self.reads = [0] * len(urls)
+        self.failures = [0] * len(urls)
+        self.primary_reads = 0
+        self._turn = itertools.count()
+
+    def open(self) -> list[AsyncEngine]:
+        if not self.engines and self.urls:
+            self.engines = [create_async_engine(url, **engine_options(url))
+                            for url in self.urls]
+            self.pool_events = [count_pool_events(engine.sync_engine)
+                                for engine in self.engines]
+            self.session_makers = [
+                async_sessionmaker(autocommit=False, autoflush=False,
+                                   bind=engine)
+                for engine in self.engines]
+        return self.engines
+
+    def is_up(self, index: int) -> bool:
+        return self.down_until[index] <= time.monotonic()
+
+    def pick(self) -> int | None:
+        # Round-robin по живым репликам; упавшая пропускается,
+        # пока не пройдёт retry_seconds
+        for _ in range(len(self.engines)):
+            index = next(self._turn) % len(self.engines)
+            if self.is_up(index):
+                return index
+        return None
+
+    def mark_down(self, index: int) -> None:
+        self.failures[index] += 1
+        self.down_until[index] = time.monotonic() + self.retry_seconds
+
+    async def check(self) -> None:
+        # Активная проверка: SELECT 1 на каждой реплике
+        for index, engine in enumerate(self.engines):
+            try:
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            except (DBAPIError, OSError):
+                self.mark_down(index)
+            else:
+                self.down_until[index] = 0.0
+
+    async def monitor(self, interval: float) -> None:
+        # Фоновая проверка из lifespan: реплика выходит из ротации и
+        # возвращается в неё без ошибок в запросах
+        while self.engines:
+            try:
+                await self.check()
+            except Exception:
+                logger.exception("Replica health check failed")
+            await asyncio.sleep(interval)
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
+
+
+replica_set = ReplicaSet(DATABASE_REPLICA_URLS, REPLICA_RETRY_SECONDS)
+
+
+def _signature(until: str) -> str:
+    return hmac.new(SECRET_KEY.encode(), f"{PRIMARY_COOKIE}:{until}".encode(),
+                    hashlib.sha256).hexdigest()
+
+
+def primary_mark(until: float) -> str:
+    value = f"{until:.3f}"
+    return f"{value}.{_signature(value)}"
+
+
+def pinned_to_primary(request: Request) -> bool:
+    # Метка нужна только при репликах. Она подписана и действует не дольше
+    # REPLICA_STICKY_SECONDS (плюс секунда на расхождение часов воркеров):
+    # иначе любой клиент мог бы навсегда обойти реплики и кэш ответов
+    if not replica_set.engines:
+        return False
+    value = (request.headers.get(PRIMARY_HEADER)
+             or request.cookies.get(PRIMARY_COOKIE))
+    if not value:
+        return False
+    until, _, signature = value.rpartition(".")
+    if not hmac.compare_digest(signature, _signature(until)):
+        return False
+    try:
+        until = float(until)
+    except ValueError:
+        return False
+    now = time.time()
+    return now < until <= now + REPLICA_STICKY_SECONDS + 1
+
+
+def read_session_maker(request: Request) -> async_sessionmaker:
+    # Для потоковых ответов, которые открывают сессию сами
+    index = None if pinned_to_primary(request) else replica_set.pick()
+    if index is None:
+        replica_set.primary_reads += 1
+        return async_session_maker
+    replica_set.reads[index] += 1
+    return replica_set.session_makers[index]
+
+
+async def read_your_writes_middleware(request: Request, call_next):
+    response = await call_next(request)
+    if (replica_set.engines and request.method not in READ_METHODS
+            and response.status_code < 400):
+        until = primary_mark(time.time() + REPLICA_STICKY_SECONDS)
+        response.set_cookie(PRIMARY_COOKIE, until,
+                            max_age=math.ceil(REPLICA_STICKY_SECONDS),
+                            httponly=True, samesite="lax")
+        response.headers[PRIMARY_HEADER] = until
+    return response
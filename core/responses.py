@@ -0,0 +1,9 @@
+from typing import Any
+from fastapi.responses import ORJSONResponse
+
+
+def fast_json(content: Any) -> ORJSONResponse:
+    # Быстрый путь для списков: данные уже приведены к форме ответа,
+    # поэтому повторная валидация response_model не нужна, а orjson
+    # сериализует dict/datetime без jsonable_encoder
+    return ORJSONResponse(content)
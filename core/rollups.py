@@ -0,0 +1,226 @@
+if __name__ == "__main__":
+    # Запуск скриптом: .env читается до импорта config, как в main.py
+    from dotenv import load_dotenv
+    load_dotenv()
+
+import asyncio
+import datetime
+from collections import defaultdict
+from collections.abc import Iterable
+from sqlalchemy import (and_, delete, func, insert, literal, literal_column,
+                        or_, select)
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import async_session_maker, init_engine, upsert
+from core.visibility import post_visible
+from models.posts import Post
+from models.review_rollups import ReviewRollup, PostReviewRollup
+from models.reviews import Review
+import models.users  # noqa: F401  регистрирует User для relationship
+from config import ROLLUP_BACKFILL_DAYS
+
+# Агрегаты отзывов по времени: review_rollups - всего за час и за сутки,
+# post_review_rollups - по постам за сутки и за месяц. Обновляются
+# в транзакции записи отзыва, история заполняется backfill
+
+PERIODS = ("hour", "day")
+POST_PERIODS = ("day", "month")
+rollup_table = ReviewRollup.__table__
+post_rollup_table = PostReviewRollup.__table__
+# Ключ advisory-блокировки агрегатов в PostgreSQL
+ROLLUP_LOCK = 7301
+
+
+def bucket_start(value: datetime.datetime, period: str) -> datetime.datetime:
+    if period == "hour":
+        return value.replace(minute=0, second=0, microsecond=0)
+    value = value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return value.replace(day=1) if period == "month" else value
+
+
+def _next_month(value: datetime.datetime) -> datetime.datetime:
+    return (value.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+
+
+async def _lock(db: AsyncSession, shared: bool) -> None:
+    # Записи отзывов берут блокировку разделяемо и друг другу не мешают,
+    # окно backfill - монопольно: пересчёт ждёт начатые записи, а новые
+    # ждут его commit и добавляют дельты к уже пересчитанным строкам.
+    # В SQLite пишущая транзакция и так одна
+    if db.bind.dialect.name != "postgresql":
+        return
+    lock = (func.pg_advisory_xact_lock_shared if shared
+            else func.pg_advisory_xact_lock)
+    await db.execute(select(lock(ROLLUP_LOCK)))
+
+
+async def _add(db: AsyncSession, table, keys: list[str],
+               deltas: dict[tuple, list[int]]) -> None:
+    # Ключи сортируются, как и в bump_versions, чтобы не ловить
+    # взаимоблокировки между параллельными записями
+    stmt = upsert(db, table).values([
+        {**dict(zip(keys, key)), "review_count": count, "grade_sum": grade}
+        for key, (count, grade) in sorted(deltas.items())])
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={"review_count": table.c.review_count
+              + stmt.excluded.review_count,
+              "grade_sum": table.c.grade_sum + stmt.excluded.grade_sum}))
+
+
+async def apply_rollup_deltas(
+        db: AsyncSession,
+        reviews: Iterable[tuple[datetime.datetime, int, int]],
+        sign: int = 1) -> None:
+    # reviews: (comment_date, post_id, grade) добавленных (sign=1) или
+    # удалённых и скрытых (sign=-1) активных отзывов. Commit делает вызывающий код
+    totals: dict[tuple, list[int]] = defaultdict(lambda: [0, 0])
+    per_post: dict[tuple, list[int]] = defaultdict(lambda: [0, 0])
+    for comment_date, post_id, grade in reviews:
+        for period in PERIODS:
+            bucket = totals[period, bucket_start(comment_date, period)]
+            bucket[0] += sign
+            bucket[1] += sign * grade
+        for period in POST_PERIODS:
+            bucket = per_post[period, bucket_start(comment_date, period),
+                              post_id]
+            bucket[0] += sign
+            bucket[1] += sign * grade
+    if not totals:
+        return
+    await _lock(db, shared=True)
+    await _add(db, rollup_table, ["period", "bucket_start"], totals)
+    await _add(db, post_rollup_table, ["period", "bucket_start", "post_id"],
+               per_post)
+
+
+def _in(period: str, start: datetime.datetime, end: datetime.datetime):
+    column = post_rollup_table.c
+    return and_(column.period == period, column.bucket_start >= start,
+                column.bucket_start < end)
+
+
+def _post_window(start: datetime.datetime, end: datetime.datetime):
+    # Целые месяцы окна читаются месячными строками, края - суточными:
+    # за год это порядка 12 строк на пост вместо 365
+    first_month = (start if start == bucket_start(start, "month")
+                   else _next_month(start))
+    last_month = bucket_start(end, "month")
+    if first_month >= last_month:
+        return _in("day", start, end)
+    return or_(_in("month", first_month, last_month),
+               _in("day", start, first_month),
+               _in("day", last_month, end))
+
+
+def _avg(count: int, grade_sum: int) -> float:
+    return grade_sum / count if count > 0 else 0.0
+
+
+async def review_stats(db: AsyncSession, start: datetime.datetime,
+                       end: datetime.datetime, period: str, top: int,
+                       min_reviews: int) -> dict:
+    # Ряд и лучшие посты читаются из агрегатов, reviews не сканируется
+    start = bucket_start(start, period)
+    rows = await db.execute(
+        select(rollup_table.c.bucket_start, rollup_table.c.review_count,
+               rollup_table.c.grade_sum)
+        .where(rollup_table.c.period == period,
+               rollup_table.c.bucket_start >= start,
+               rollup_table.c.bucket_start < end,
+               rollup_table.c.review_count > 0)
+        .order_by(rollup_table.c.bucket_start))
+    series = [{"start": row.bucket_start,
+               "review_count": row.review_count,
+               "avg_grade": _avg(row.review_count, row.grade_sum)}
+              for row in rows]
+    count = func.sum(post_rollup_table.c.review_count)
+    grade_sum = func.sum(post_rollup_table.c.grade_sum)
+    rows = await db.execute(
+        select(post_rollup_table.c.post_id, count.label("review_count"),
+               grade_sum.label("grade_sum"))
+        .join(Post, Post.id == post_rollup_table.c.post_id)
+        .where(_post_window(bucket_start(start, "day"), end),
+               post_visible())
+        .group_by(post_rollup_table.c.post_id)
+        .having(count >= max(min_reviews, 1))
+        .order_by((grade_sum * 1.0 / count).desc(), count.desc(),
+                  post_rollup_table.c.post_id)
+        .limit(top))
+    top_posts = [{"post_id": row.post_id,
+                  "review_count": row.review_count,
+                  "avg_grade": _avg(row.review_count, row.grade_sum)}
+                 for row in rows]
+    return {"from": start, "to": end, "bucket": period,
+            "series": series, "top_posts": top_posts}
+
+
+def _truncate(db: AsyncSession, column, period: str):
+    # Начало часа/суток/месяца на стороне базы, в формате DateTime диалекта
+    if db.bind.dialect.name == "postgresql":
+        # Литерал, а не параметр: иначе PostgreSQL не сопоставит
+        # выражение в SELECT и в GROUP BY
+        return func.date_trunc(literal_column(f"'{period}'"), column)
+    pattern = {"hour": "%Y-%m-%d %H", "day": "%Y-%m-%d 00",
+               "month": "%Y-%m-01 00"}[period]
+    return func.strftime(f"{pattern}:00:00.000000", column)
+
+
+async def backfill(db: AsyncSession,
+                   window_days: int = ROLLUP_BACKFILL_DAYS) -> None:
+    # Пересчёт окнами не короче window_days суток: в каждом окне по
+    # INSERT ... SELECT ... GROUP BY на агрегат по индексу comment_date
+    # и свой commit, без построчной обработки в Python. Каждое окно
+    # пересчитывается под монопольной блокировкой агрегатов, так что
+    # backfill можно запускать без остановки записи
+    first, last = (await db.execute(
+        select(func.min(Review.comment_date),
+               func.max(Review.comment_date)).where(Review.is_active))).one()
+    if first is None:
+        return
+    # Окна выровнены по месяцам, чтобы месячные строки пересчитывались
+    # целиком внутри одного окна
+    window = bucket_start(first, "month")
+    while window <= last:
+        until = window
+        while until <= window + datetime.timedelta(days=window_days - 1):
+            until = _next_month(until)
+        in_window = (Review.comment_date >= window,
+                     Review.comment_date < until, Review.is_active)
+        await _lock(db, shared=False)
+        await db.execute(delete(rollup_table).where(
+            rollup_table.c.bucket_start >= window,
+            rollup_table.c.bucket_start < until))
+        await db.execute(delete(post_rollup_table).where(
+            post_rollup_table.c.bucket_start >= window,
+            post_rollup_table.c.bucket_start < until))
+        for period in PERIODS:
+            bucket = _truncate(db, Review.comment_date, period)
+            await db.execute(insert(rollup_table).from_select(
+                ["period", "bucket_start", "review_count", "grade_sum"],
+                select(literal(period), bucket, func.count(Review.id),
+                       func.sum(Review.grade))
+                .where(*in_window).group_by(bucket)))
+        for period in POST_PERIODS:
+            bucket = _truncate(db, Review.comment_date, period)
+            await db.execute(insert(post_rollup_table).from_select(
+                ["period", "bucket_start", "post_id", "review_count",
+                 "grade_sum"],
+                select(literal(period), bucket, Review.post_id,
+                       func.count(Review.id), func.sum(Review.grade))
+                .where(*in_window).group_by(bucket, Review.post_id)))
+        await db.commit()
+        window = until
+
+
+async def main() -> None:
+    engine = init_engine()
+    try:
+        async with async_session_maker() as db:
+            await backfill(db)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    # Заполнить агрегаты по истории отзывов: python -m core.rollups
+    asyncio.run(main())
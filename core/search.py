@@ -0,0 +1,139 @@
+import asyncio
+import math
+import re
+import time
+from collections import Counter
+from sqlalchemy import func, literal_column, select, tuple_
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.pagination import decode_cursor, keyset_page
+from core.visibility import post_visible
+from models.posts import Post
+from config import SEARCH_INDEX_REFRESH
+
+TOKEN_RE = re.compile(r"\w+")
+TITLE_WEIGHT = 2.0
+# Столбец создаётся миграцией только в PostgreSQL, в модели его нет
+search_vector = literal_column("posts.search_vector", type_=TSVECTOR)
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+class InvertedIndex:
+    # Запасной вариант для SQLite: индекс в памяти процесса.
+    # Строится при первом поиске и периодически перечитывается из базы,
+    # чтобы подхватывать записи других воркеров
+    def __init__(self, refresh: int):
+        self.refresh = refresh
+        self.loaded_at: float | None = None
+        self._postings: dict[str, dict[int, float]] = {}
+        self._terms: dict[int, list[str]] = {}
+        self._lock = asyncio.Lock()
+
+    def _add(self, post_id: int, title: str, text: str) -> None:
+        weights = Counter()
+        for token in tokenize(title):
+            weights[token] += TITLE_WEIGHT
+        for token in tokenize(text):
+            weights[token] += 1.0
+        self._terms[post_id] = list(weights)
+        for token, weight in weights.items():
+            self._postings.setdefault(token, {})[post_id] = weight
+
+    def add(self, post_id: int, title: str, text: str) -> None:
+        if self.loaded_at is not None:
+            self.remove(post_id)
+            self._add(post_id, title, text)
+
+    def remove(self, post_id: int) -> None:
+        for token in self._terms.pop(post_id, ()):
+            postings = self._postings[token]
+            postings.pop(post_id, None)
+            if not postings:
+                del self._postings[token]
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        if self.loaded_at is not None and \
+                time.monotonic() - self.loaded_at < self.refresh:
+            return
+        async with self._lock:
+            if self.loaded_at is not None and \
+                    time.monotonic() - self.loaded_at < self.refresh:
+                return
+            self._postings, self._terms = {}, {}
+            result = await db.stream(
+                select(Post.id, Post.title, Post.text)
+                .where(post_visible())
+                .execution_options(yield_per=5000))
+            async for rows in result.partitions():
+                for row in rows:
+                    self._add(row.id, row.title, row.text)
+            self.loaded_at = time.monotonic()
+
+    def search(self, query: str) -> list[tuple[float, int]]:
+        # Все слова запроса должны встретиться; вес - tf * idf
+        tokens = set(tokenize(query))
+        postings = [self._postings.get(token, {}) for token in tokens]
+        if not postings or not all(postings):
+            return []
+        total = len(self._terms)
+        scores: dict[int, float] = {}
+        for posting in sorted(postings, key=len):
+            idf = math.log(1 + total / len(posting))
+            if not scores:
+                scores = {post_id: weight * idf
+                          for post_id, weight in posting.items()}
+            else:
+                scores = {post_id: score + posting[post_id] * idf
+                          for post_id, score in scores.items()
+                          if post_id in posting}
+        return sorted(((score, post_id) for post_id, score in scores.items()),
+                      reverse=True)
+
+
+search_index = InvertedIndex(SEARCH_INDEX_REFRESH)
+
+
+async def _search_postgresql(db: AsyncSession, q: str, limit: int,
+                             cursor: str | None) -> tuple[list, str | None]:
+    ts_query = func.websearch_to_tsquery("simple", q)
+    rank = func.ts_rank(search_vector, ts_query)
+    query = select(Post, rank.label("rank")).where(
+        search_vector.op("@@")(ts_query),
+        post_visible()).order_by(rank.desc(), Post.id.desc())
+    if cursor is not None:
+        query = query.where(tuple_(rank, Post.id) < decode_cursor(
+            cursor, float, int))
+    rows = await db.execute(query.limit(limit + 1))
+    page, next_cursor = keyset_page(rows.all(), limit,
+                                    lambda row: (row.rank, row.Post.id))
+    return [row.Post for row in page], next_cursor
+
+
+async def _search_in_process(db: AsyncSession, q: str, limit: int,
+                             cursor: str | None) -> tuple[list, str | None]:
+    await search_index.ensure_loaded(db)
+    ranked = search_index.search(q)
+    if cursor is not None:
+        last = decode_cursor(cursor, float, int)
+        ranked = [item for item in ranked if item < last]
+    page, next_cursor = keyset_page(ranked[:limit + 1], limit,
+                                    lambda item: item)
+    if not page:
+        return [], None
+    posts = await db.scalars(select(Post).where(
+        Post.id.in_([post_id for _, post_id in page]),
+        post_visible()))
+    by_id = {post.id: post for post in posts}
+    # Индекс может отставать от базы: удалённые посты просто пропускаем
+    return [by_id[post_id] for _, post_id in page
+            if post_id in by_id], next_cursor
+
+
+async def search_posts(db: AsyncSession, q: str, limit: int,
+                       cursor: str | None) -> tuple[list, str | None]:
+    if db.bind.dialect.name == "postgresql":
+        return await _search_postgresql(db, q, limit, cursor)
+    return await _search_in_process(db, q, limit, cursor)
@@ -0,0 +1,72 @@
+if __name__ == "__main__":
+    # Запуск скриптом: .env читается до импорта config, как в main.py
+    from dotenv import load_dotenv
+    load_dotenv()
+
+import asyncio
+from sqlalchemy import Float, Integer, bindparam, case, cast, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import async_session_maker, init_engine
+from models.post_stats import PostStats
+from models.posts import Post
+from models.reviews import Review
+import models.users  # noqa: F401  регистрирует User для relationship
+
+stats_table = PostStats.__table__
+
+
+def _avg(count, grade_sum):
+    return case((count > 0, cast(grade_sum, Float) / count), else_=0.0)
+
+
+_apply_deltas = stats_table.update().where(
+    stats_table.c.post_id == bindparam("b_post_id")).values(
+        review_count=stats_table.c.review_count
+        + bindparam("b_count", type_=Integer),
+        grade_sum=stats_table.c.grade_sum
+        + bindparam("b_grade", type_=Integer),
+        avg_grade=_avg(
+            stats_table.c.review_count + bindparam("b_count", type_=Integer),
+            stats_table.c.grade_sum + bindparam("b_grade", type_=Integer)))
+
+
+async def apply_review_deltas(db: AsyncSession,
+                              deltas: dict[int, tuple[int, int]]) -> None:
+    # deltas: post_id -> (изменение числа отзывов, изменение суммы оценок).
+    # Выполняется в транзакции вызывающего кода, commit делает он же
+    if not deltas:
+        return
+    await db.execute(_apply_deltas, [
+        {"b_post_id": post_id, "b_count": count, "b_grade": grade}
+        for post_id, (count, grade) in deltas.items()])
+
+
+async def rebuild_post_stats(db: AsyncSession) -> None:
+    totals = select(Review.post_id,
+                    func.count(Review.id).label("review_count"),
+                    func.sum(Review.grade).label("grade_sum")
+                    ).where(Review.is_active).group_by(
+                        Review.post_id).subquery()
+    review_count = func.coalesce(totals.c.review_count, 0)
+    grade_sum = func.coalesce(totals.c.grade_sum, 0)
+    await db.execute(delete(stats_table))
+    await db.execute(insert(stats_table).from_select(
+        ["post_id", "review_count", "grade_sum", "avg_grade"],
+        select(Post.id, review_count, grade_sum,
+               _avg(review_count, grade_sum)).outerjoin(
+                   totals, totals.c.post_id == Post.id)))
+
+
+async def main() -> None:
+    engine = init_engine()
+    try:
+        async with async_session_maker() as db:
+            await rebuild_post_stats(db)
+            await db.commit()
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    # Полный пересчёт агрегатов: python -m core.stats
+    asyncio.run(main())
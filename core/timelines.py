@@ -0,0 +1,105 @@
+import datetime
+import logging
+from collections import defaultdict
+from sqlalchemy import select, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import async_session_maker, upsert
+from core.pagination import decode_cursor, keyset_page
+from core.visibility import post_visible
+from models.follows import Follow
+from models.posts import Post
+from models.timelines import TimelineEntry
+from models.users import User
+from config import FANOUT_THRESHOLD, FANOUT_BATCH_SIZE, FOLLOW_BACKFILL
+
+logger = logging.getLogger(__name__)
+timeline_table = TimelineEntry.__table__
+
+
+async def fan_out(posts: list) -> None:
+    # Фоновая задача после commit: раскладывает новые посты по лентам
+    # подписчиков. posts - строки/объекты с id, user_id и date.
+    # Подписчики всех авторов читаются одним запросом на пачку
+    by_author = defaultdict(list)
+    for post in posts:
+        by_author[post.user_id].append(post)
+    last = (0, 0)
+    try:
+        async with async_session_maker() as db:
+            while True:
+                rows = (await db.execute(
+                    select(Follow.followee_id, Follow.follower_id)
+                    .join(User, User.id == Follow.followee_id)
+                    .where(Follow.followee_id.in_(by_author),
+                           User.follower_count < FANOUT_THRESHOLD,
+                           tuple_(Follow.followee_id,
+                                  Follow.follower_id) > last)
+                    .order_by(Follow.followee_id, Follow.follower_id)
+                    .limit(FANOUT_BATCH_SIZE))).all()
+                if not rows:
+                    return
+                await db.execute(
+                    upsert(db, timeline_table).on_conflict_do_nothing(),
+                    [{"user_id": row.follower_id, "post_id": post.id,
+                      "author_id": row.followee_id, "date": post.date}
+                     for row in rows for post in by_author[row.followee_id]])
+                await db.commit()
+                last = tuple(rows[-1])
+    except Exception:
+        logger.exception("Timeline fan-out failed")
+
+
+async def backfill(db: AsyncSession, user_id: int, author_id: int) -> None:
+    # Последние посты автора сразу появляются в ленте нового подписчика
+    recent = select(Post.id, Post.date).where(
+        Post.user_id == author_id, post_visible()).order_by(
+            Post.date.desc(), Post.id.desc()).limit(FOLLOW_BACKFILL)
+    rows = (await db.execute(recent)).all()
+    if rows:
+        await db.execute(
+            upsert(db, timeline_table).on_conflict_do_nothing(),
+            [{"user_id": user_id, "post_id": row.id, "author_id": author_id,
+              "date": row.date} for row in rows])
+
+
+async def read_feed(db: AsyncSession, user_id: int, limit: int,
+                    cursor: str | None) -> tuple[list, str | None]:
+    # Материализованная лента плюс посты популярных авторов, которые
+    # читаются напрямую: не больше limit + 1 строк из каждого источника
+    last = decode_cursor(cursor, datetime.datetime, int) \
+        if cursor is not None else None
+
+    query = select(Post).join(
+        TimelineEntry, TimelineEntry.post_id == Post.id).where(
+            TimelineEntry.user_id == user_id,
+            post_visible()).order_by(
+                TimelineEntry.date.desc(), TimelineEntry.post_id.desc())
+    if last is not None:
+        query = query.where(
+            tuple_(TimelineEntry.date, TimelineEntry.post_id) < last)
+    posts = {post.id: post
+             for post in await db.scalars(query.limit(limit + 1))}
+
+    popular = (await db.scalars(select(Follow.followee_id).join(
+        User, User.id == Follow.followee_id).where(
+            Follow.follower_id == user_id,
+            User.follower_count >= FANOUT_THRESHOLD))).all()
+    if popular:
+        parts = []
+        for author_id in popular:
+            part = select(Post.id).where(Post.user_id == author_id,
+                                        post_visible())
+            if last is not None:
+                part = part.where(tuple_(Post.date, Post.id) < last)
+            part = part.order_by(Post.date.desc(),
+                                 Post.id.desc()).limit(limit + 1).subquery()
+            parts.append(select(part.c.id))
+        ids = parts[0] if len(parts) == 1 else union_all(*parts)
+        pulled = await db.scalars(select(Post).where(Post.id.in_(ids)))
+        for post in pulled:
+            posts.setdefault(post.id, post)
+
+    merged = sorted(posts.values(), key=lambda post: (post.date, post.id),
+                    reverse=True)
+    return keyset_page(merged[:limit + 1], limit,
+                       lambda post: (post.date, post.id))
@@ -0,0 +1,96 @@
+import contextvars
+import logging
+import time
+from fastapi import Request
+from sqlalchemy import event
+from core.metrics import Histogram, registry
+from config import SLOW_QUERY_MS
+
+logger = logging.getLogger(__name__)
+
+request_latency = registry.register(Histogram(
+    "http_request_duration_seconds", "Request latency by route"))
+request_db_latency = registry.register(Histogram(
+    "http_request_db_seconds", "Database time per request by route"))
+request_statements = registry.register(Histogram(
+    "http_request_db_statements", "SQL statements per request by route",
+    buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100)))
+
+
+class RequestTimings:
+    def __init__(self):
+        self.statements = 0
+        self.spans = {"db": 0.0, "auth": 0.0, "hash": 0.0}
+
+    def server_timing(self, total: float) -> str:
+        other = total - sum(self.spans.values())
+        parts = [f'db;dur={self.spans["db"] * 1000:.1f};'
+                 f'desc="{self.statements} queries"']
+        parts += [f"{name};dur={seconds * 1000:.1f}"
+                  for name, seconds in self.spans.items() if name != "db"]
+        parts.append(f"app;dur={max(other, 0) * 1000:.1f}")
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+current_timings: contextvars.ContextVar[RequestTimings | None] = \
+    contextvars.ContextVar("current_timings", default=None)
+
+
+def add_timing(name: str, seconds: float) -> None:
+    timings = current_timings.get()
+    if timings is not None:
+        timings.spans[name] = timings.spans.get(name, 0.0) + seconds
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    # Начало запроса хранится в его контексте выполнения: если запрос
+    # упадёт, after_cursor_execute не вызовется и контекст просто
+    # уйдёт вместе с ним, ничего не оставив на соединении
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    start = getattr(context, "_query_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    timings = current_timings.get()
+    if timings is not None:
+        timings.statements += 1
+        timings.spans["db"] += elapsed
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning("Slow query (%.1f ms): %s", elapsed * 1000,
+                       " ".join(statement.split()))
+
+
+def instrument(target) -> None:
+    # Время и число запросов в Server-Timing, метриках и журнале медленных
+    # запросов - для основной базы и каждой реплики
+    if event.contains(target, "before_cursor_execute",
+                      _before_cursor_execute):
+        return
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+
+
+async def server_timing_middleware(request: Request, call_next):
+    timings = RequestTimings()
+    token = current_timings.set(timings)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        current_timings.reset(token)
+    total = time.perf_counter() - start
+    route = request.scope.get("route")
+    labels = {"method": request.method,
+              "route": route.path if route is not None else "unmatched"}
+    request_latency.observe(total, **labels)
+    request_db_latency.observe(timings.spans["db"], **labels)
+    request_statements.observe(timings.statements, **labels)
+    response.headers["Server-Timing"] = timings.server_timing(total)
+    return response
@@ -0,0 +1,78 @@
+import datetime
+import random
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import upsert
+from models.versions import CollectionVersion
+from config import VERSION_SHARDS
+
+versions_table = CollectionVersion.__table__
+
+
+def post_reviews_key(post_id: int) -> str:
+    return f"reviews:post:{post_id}"
+
+
+async def bump_versions(db: AsyncSession, *keys: str) -> None:
+    # Вызывать последним запросом перед commit: строка версии блокируется
+    # до конца транзакции. Ключ разбит на VERSION_SHARDS строк, транзакция
+    # берёт случайную: записи в одну коллекцию ("posts", "reviews") не
+    # выстраиваются в очередь за одной строкой. Ключи сортируются, чтобы
+    # не ловить взаимоблокировки
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    shard = random.randrange(VERSION_SHARDS)
+    stmt = upsert(db, versions_table).values(
+        [{"key": key, "shard": shard, "version": 1, "updated_at": now}
+         for key in sorted(set(keys))])
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["key", "shard"],
+        set_={"version": versions_table.c.version + 1,
+              "updated_at": stmt.excluded.updated_at}))
+
+
+async def version_headers(db: AsyncSession, *keys: str) -> dict[str, str]:
+    # ETag и Last-Modified по текущим версиям коллекций
+    rows = (await db.execute(
+        select(versions_table.c.key,
+               func.sum(versions_table.c.version).label("version"),
+               func.max(versions_table.c.updated_at).label("updated_at"))
+        .where(versions_table.c.key.in_(keys))
+        .group_by(versions_table.c.key))).all()
+    versions = {row.key: row for row in rows}
+    etag = 'W/"' + ".".join(str(versions[key].version if key in versions
+                                else 0) for key in keys) + '"'
+    headers = {"ETag": etag}
+    last_modified = max((row.updated_at for row in rows), default=None)
+    if last_modified is not None:
+        last_modified = last_modified.replace(
+            microsecond=0, tzinfo=datetime.timezone.utc)
+        headers["Last-Modified"] = format_datetime(last_modified,
+                                                   usegmt=True)
+    return headers
+
+
+def conditional_response(request: Request,
+                         headers: dict[str, str]) -> Response | None:
+    # 304, если клиент уже видел ответ с такими ETag/Last-Modified
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        if headers["ETag"] in tags or "*" in tags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
+        return None
+    if_modified_since = request.headers.get("if-modified-since")
+    last_modified = headers.get("Last-Modified")
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return None
+        if (since.tzinfo is not None
+                and parsedate_to_datetime(last_modified) <= since):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
+    return None
+
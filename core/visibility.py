@@ -0,0 +1,34 @@
+from sqlalchemy import and_, exists, select
+from sqlalchemy.orm import aliased
+from models.posts import Post
+from models.reviews import Review
+from models.users import User
+
+# Удаление аккаунта или поста помечает одну строку deleted_at, а зависимые
+# строки удаляет фоновая очистка (core.purge). До неё чтение скрывает
+# посты и отзывы удалённых авторов этими условиями: коррелированный
+# EXISTS по первичному ключу users/posts на каждую строку. Псевдонимы -
+# чтобы подзапрос не сливался с users/posts внешнего запроса
+
+
+def author_deleted(user_id):
+    author = aliased(User)
+    return exists(select(author.id).where(
+        author.id == user_id, author.deleted_at.is_not(None))
+    ).correlate_except(author)
+
+
+def post_visible(post=Post):
+    return and_(post.deleted_at.is_(None), ~author_deleted(post.user_id))
+
+
+def review_visible(include_inactive: bool = False):
+    # Активный отзыв живого автора к видимому посту; скрытые модерацией
+    # включаются только по явному флагу (выгрузка для модераторов)
+    post = aliased(Post)
+    condition = and_(~author_deleted(Review.user_id),
+                     exists(select(post.id).where(post.id == Review.post_id,
+                                                  post_visible(post))
+                            ).correlate_except(post))
+    return condition if include_inactive else and_(Review.is_active,
+                                                   condition)
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import time
+import jwt
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from core import database
+from core.hashing import hashing_pool, bcrypt_hash
+from core.pubsub import hub
+from core.replicas import replica_set
+from config import (SECRET_KEY, ALGORITHM, WARMUP_CONNECTIONS, WARMUP_PATHS,
+                    WARMUP_TIMEOUT)
+
+logger = logging.getLogger(__name__)
+
+# Первые запросы после старта иначе платят за соединения с базой,
+# загрузку bcrypt, потоки пула хэширования и компиляцию SQL
+
+
+async def _ping(connection) -> None:
+    await connection.start()
+    await connection.execute(text("SELECT 1"))
+
+
+async def open_connections(target: AsyncEngine, count: int) -> None:
+    # Соединения держатся одновременно, иначе пул выдаст одно и то же
+    connections = [target.connect() for _ in range(count)]
+    try:
+        results = await asyncio.gather(
+            *(_ping(connection) for connection in connections),
+            return_exceptions=True)
+    finally:
+        for connection in connections:
+            if connection.sync_connection is not None:
+                await connection.close()
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+
+async def warm_hashing() -> None:
+    # По задаче на каждый поток (процесс) пула: backend passlib
+    # загружается в каждом из них
+    await asyncio.gather(*(hashing_pool.run(bcrypt_hash, "warm-up")
+                           for _ in range(hashing_pool.workers)))
+
+
+def warm_jwt() -> None:
+    token = jwt.encode({"sub": "warm-up"}, SECRET_KEY, algorithm=ALGORITHM)
+    jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+
+async def request(app, path: str) -> int:
+    # GET через само приложение, без сети и HTTP-клиента: тот же путь,
+    # что у настоящего запроса, включая кэш компиляции SQLAlchemy
+    path, _, query = path.partition("?")
+    scope = {"type": "http", "asgi": {"version": "3.0"},
+             "http_version": "1.1", "method": "GET", "scheme": "http",
+             "path": path, "raw_path": path.encode(), "root_path": "",
+             "query_string": query.encode(), "headers": [],
+             "client": ("127.0.0.1", 0), "server": ("warm-up", 80)}
+    status = 0
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+class WarmUp:
+    # Состояние прогрева одного приложения: steps - длительность шагов
+    # в секундах для /health/ready
+    def __init__(self, paths: list[str] = WARMUP_PATHS,
+                 connections: int = WARMUP_CONNECTIONS,
+                 timeout: float = WARMUP_TIMEOUT):
+        self.paths = paths
+        self.connections = connections
+        self.timeout = timeout
+        self.done = False
+        self.steps: dict[str, float] = {}
+
+    async def _step(self, name: str, coro) -> None:
+        # Неудачный шаг не останавливает остальные: готовность всё равно
+        # проверяется запросом в базу
+        start = time.perf_counter()
+        try:
+            await coro
+        except Exception:
+            logger.exception("Warm-up step %s failed", name)
+        self.steps[name] = round(time.perf_counter() - start, 4)
+
+    async def _run(self, app) -> None:
+        if self.connections > 0:
+            await self._step("db", open_connections(database.engine,
+                                                    self.connections))
+            await replica_set.check()
+            for index, target in enumerate(replica_set.engines):
+                if replica_set.is_up(index):
+                    await self._step(f"replica_{index}", open_connections(
+                        target, self.connections))
+        await self._step("hashing", warm_hashing())
+        await self._step("jwt", asyncio.to_thread(warm_jwt))
+        await self._step("pubsub", hub.start())
+        for path in self.paths:
+            await self._step(f"GET {path}", request(app, path))
+
+    async def run(self, app) -> None:
+        try:
+            await asyncio.wait_for(self._run(app), self.timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Warm-up did not finish in %s s", self.timeout)
+        self.done = True
@@ -1,14 +1,71 @@
-from fastapi import FastAPI
-from routers import users, posts, reviews
+from dotenv import load_dotenv
+
+# .env читается здесь, до импорта config: сам config берёт значения
+# только из окружения
+load_dotenv()
 
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+from routers import users, posts, reviews, metrics, purge, health
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from core import database
+from core.db_depends import pool_timeout_handler
+from core.hashing import hashing_pool
+from core.timing import instrument, server_timing_middleware
+from core.replicas import read_your_writes_middleware, replica_set
+from core.purge import purge_worker
+from core.pubsub import hub
+from core.warmup import WarmUp
+from config import REPLICA_CHECK_INTERVAL
 
-app = FastAPI()
 
-app.include_router(users.router)
-app.include_router(posts.router)
-app.include_router(reviews.router)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Прогрев в фоне: /health/live отвечает сразу, /health/ready - после
+    # прогрева. Очистка, прерванная перезапуском или упавшая, продолжается
+    # в фоне
+    tasks = [asyncio.create_task(app.state.warmup.run(app)),
+             asyncio.create_task(purge_worker()),
+             asyncio.create_task(
+                 replica_set.monitor(REPLICA_CHECK_INTERVAL))]
+    yield
+    app.state.stopping = True
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    # Дописать пачки группового commit, накопленные к остановке
+    await posts.post_writes.stop()
+    await reviews.review_writes.stop()
+    await hub.stop()
+    hashing_pool.shutdown()
+    await replica_set.dispose()
+    await database.engine.dispose()
 
 
-@app.get("/")
 def root() -> dict:
     return {"message": "Hello, microblog!"}
+
+
+def create_app(warmup: WarmUp | None = None) -> FastAPI:
+    # Движки основной базы и реплик создаются здесь, а не при импорте
+    for engine in [database.init_engine(), *replica_set.open()]:
+        instrument(engine.sync_engine)
+    app = FastAPI(lifespan=lifespan)
+    app.add_exception_handler(PoolTimeoutError, pool_timeout_handler)
+    app.state.warmup = warmup or WarmUp()
+    app.state.stopping = False
+    app.middleware("http")(server_timing_middleware)
+    app.middleware("http")(read_your_writes_middleware)
+
+    app.include_router(users.router)
+    app.include_router(posts.router)
+    app.include_router(reviews.router)
+    app.include_router(purge.router)
+    app.include_router(metrics.router)
+    app.include_router(health.router)
+    app.get("/")(root)
+    return app
+
+
+app = create_app()
@@ -1,15 +1,25 @@
 import os
 from logging.config import fileConfig
 
+from dotenv import load_dotenv
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
 from alembic import context
 
+load_dotenv()
+
 from core.database import Base
 from models.posts import Post
 from models.users import User
 from models.reviews import Review
+from models.post_stats import PostStats
+from models.versions import CollectionVersion
+from models.follows import Follow
+from models.timelines import TimelineEntry
+from models.purge_jobs import PurgeJob
+from models.review_rollups import ReviewRollup, PostReviewRollup
+from models.reviews_archive import ReviewArchive
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,38 @@
+"""Keyset pagination indexes
+
+Revision ID: 3c9e1a7d4b20
+Revises: f8bd32f5b172
+Create Date: 2026-10-18 10:12:41.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e1a7d4b20'
+down_revision: Union[str, Sequence[str], None] = 'f8bd32f5b172'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_posts_date_id', 'posts', ['date', 'id'],
+                    unique=False)
+    op.create_index('ix_posts_user_id_date_id', 'posts',
+                    ['user_id', 'date', 'id'], unique=False)
+    op.create_index('ix_reviews_comment_date_id', 'reviews',
+                    ['comment_date', 'id'], unique=False)
+    op.create_index('ix_reviews_user_id_comment_date_id', 'reviews',
+                    ['user_id', 'comment_date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reviews_user_id_comment_date_id', table_name='reviews')
+    op.drop_index('ix_reviews_comment_date_id', table_name='reviews')
+    op.drop_index('ix_posts_user_id_date_id', table_name='posts')
+    op.drop_index('ix_posts_date_id', table_name='posts')
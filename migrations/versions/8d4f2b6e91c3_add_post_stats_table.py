@@ -0,0 +1,46 @@
+"""Add post_stats table
+
+Revision ID: 8d4f2b6e91c3
+Revises: 3c9e1a7d4b20
+Create Date: 2026-10-18 11:03:27.918346
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4f2b6e91c3'
+down_revision: Union[str, Sequence[str], None] = '3c9e1a7d4b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('post_stats',
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('review_count', sa.Integer(), nullable=False),
+    sa.Column('grade_sum', sa.Integer(), nullable=False),
+    sa.Column('avg_grade', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('post_id')
+    )
+    op.create_index('ix_post_stats_avg_grade_post_id', 'post_stats',
+                    ['avg_grade', 'post_id'], unique=False)
+    # Заполняем агрегаты для уже существующих постов
+    op.execute(
+        "INSERT INTO post_stats (post_id, review_count, grade_sum, avg_grade) "
+        "SELECT posts.id, COUNT(reviews.id), COALESCE(SUM(reviews.grade), 0), "
+        "COALESCE(AVG(CAST(reviews.grade AS FLOAT)), 0) "
+        "FROM posts LEFT OUTER JOIN reviews ON reviews.post_id = posts.id "
+        "GROUP BY posts.id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_post_stats_avg_grade_post_id', table_name='post_stats')
+    op.drop_table('post_stats')
@@ -0,0 +1,72 @@
+"""Soft delete and purge jobs
+
+Revision ID: 9a7c2e4f1b36
+Revises: 61c3e8b5d9a0
+Create Date: 2026-10-18 16:05:41.382907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a7c2e4f1b36'
+down_revision: Union[str, Sequence[str], None] = '61c3e8b5d9a0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (таблица, колонка, ссылка) внешних ключей, которые получают ON DELETE CASCADE
+CASCADE_FOREIGN_KEYS = [
+    ('posts', 'user_id', 'users'),
+    ('reviews', 'post_id', 'posts'),
+    ('reviews', 'user_id', 'users'),
+]
+
+
+def _replace_foreign_keys(ondelete: str | None) -> None:
+    # Имена ограничений - стандартные имена PostgreSQL; SQLite не умеет
+    # менять внешние ключи без пересоздания таблиц, там каскад не нужен
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table, column, referred in CASCADE_FOREIGN_KEYS:
+        name = f'{table}_{column}_fkey'
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referred, [column], ['id'],
+                              ondelete=ondelete)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('deleted_at', sa.DateTime(),
+                                     nullable=True))
+    op.add_column('posts', sa.Column('deleted_at', sa.DateTime(),
+                                     nullable=True))
+    op.create_table('purge_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('target_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('posts_deleted', sa.Integer(), server_default='0',
+              nullable=False),
+    sa.Column('reviews_deleted', sa.Integer(), server_default='0',
+              nullable=False),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_purge_jobs_status', 'purge_jobs', ['status'],
+                    unique=False)
+    _replace_foreign_keys('CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _replace_foreign_keys(None)
+    op.drop_index('ix_purge_jobs_status', table_name='purge_jobs')
+    op.drop_table('purge_jobs')
+    op.drop_column('posts', 'deleted_at')
+    op.drop_column('users', 'deleted_at')
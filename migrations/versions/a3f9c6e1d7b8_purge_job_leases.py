@@ -0,0 +1,36 @@
+"""Purge job leases and retry attempts
+
+Revision ID: a3f9c6e1d7b8
+Revises: e6b3d8a2f4c1
+Create Date: 2026-10-19 10:12:44.508311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f9c6e1d7b8'
+down_revision: Union[str, Sequence[str], None] = 'e6b3d8a2f4c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('purge_jobs', sa.Column('attempts', sa.Integer(),
+                                          server_default='0',
+                                          nullable=False))
+    op.add_column('purge_jobs', sa.Column('owner', sa.String(length=64),
+                                          nullable=True))
+    op.add_column('purge_jobs', sa.Column('lease_until', sa.DateTime(),
+                                          nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('purge_jobs', 'lease_until')
+    op.drop_column('purge_jobs', 'owner')
+    op.drop_column('purge_jobs', 'attempts')
@@ -0,0 +1,31 @@
+"""Add foreign key indexes
+
+Revision ID: b71e05c9a3d8
+Revises: 8d4f2b6e91c3
+Create Date: 2026-10-18 11:47:05.331072
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b71e05c9a3d8'
+down_revision: Union[str, Sequence[str], None] = '8d4f2b6e91c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # posts.user_id и reviews.user_id уже покрыты ведущими столбцами
+    # ix_posts_user_id_date_id и ix_reviews_user_id_comment_date_id
+    op.create_index('ix_reviews_post_id_comment_date_id', 'reviews',
+                    ['post_id', 'comment_date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reviews_post_id_comment_date_id', table_name='reviews')
@@ -0,0 +1,33 @@
+"""Replace full reviews (post_id, comment_date, id) index with post_id
+
+Revision ID: b8d4e2f6a9c3
+Revises: a3f9c6e1d7b8
+Create Date: 2026-10-19 11:03:27.915402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d4e2f6a9c3'
+down_revision: Union[str, Sequence[str], None] = 'a3f9c6e1d7b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Страницы отзывов поста читаются из частичного индекса по активным,
+    # полный нужен только внешнему ключу и очистке
+    op.create_index('ix_reviews_post_id', 'reviews', ['post_id'],
+                    unique=False)
+    op.drop_index('ix_reviews_post_id_comment_date_id', table_name='reviews')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_reviews_post_id_comment_date_id', 'reviews',
+                    ['post_id', 'comment_date', 'id'], unique=False)
+    op.drop_index('ix_reviews_post_id', table_name='reviews')
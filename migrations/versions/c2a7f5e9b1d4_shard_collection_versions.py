@@ -0,0 +1,50 @@
+"""Shard collection version counters
+
+Revision ID: c2a7f5e9b1d4
+Revises: b8d4e2f6a9c3
+Create Date: 2026-10-19 14:26:51.308417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2a7f5e9b1d4'
+down_revision: Union[str, Sequence[str], None] = 'b8d4e2f6a9c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Текущие версии остаются в shard 0
+    op.add_column('collection_versions',
+                  sa.Column('shard', sa.Integer(), server_default='0',
+                            nullable=False))
+    op.drop_constraint('collection_versions_pkey', 'collection_versions',
+                       type_='primary')
+    op.create_primary_key('collection_versions_pkey', 'collection_versions',
+                          ['key', 'shard'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Сворачивает shard в одну строку на ключ с суммой версий
+    op.execute(
+        "INSERT INTO collection_versions (key, shard, version, updated_at) "
+        "SELECT key, 0, 0, max(updated_at) FROM collection_versions "
+        "GROUP BY key HAVING min(shard) > 0")
+    op.execute(
+        "UPDATE collection_versions AS v SET version = s.version, "
+        "updated_at = s.updated_at FROM (SELECT key, sum(version) AS version, "
+        "max(updated_at) AS updated_at FROM collection_versions "
+        "GROUP BY key) AS s WHERE v.key = s.key AND v.shard = 0")
+    op.execute("DELETE FROM collection_versions WHERE shard <> 0")
+    op.drop_constraint('collection_versions_pkey', 'collection_versions',
+                       type_='primary')
+    op.create_primary_key('collection_versions_pkey', 'collection_versions',
+                          ['key'])
+    op.drop_column('collection_versions', 'shard')
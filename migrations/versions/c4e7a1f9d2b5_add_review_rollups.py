@@ -0,0 +1,49 @@
+"""Add review rollup tables
+
+Revision ID: c4e7a1f9d2b5
+Revises: 9a7c2e4f1b36
+Create Date: 2026-10-18 20:41:09.215734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e7a1f9d2b5'
+down_revision: Union[str, Sequence[str], None] = '9a7c2e4f1b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('review_rollups',
+    sa.Column('period', sa.String(length=4), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('review_count', sa.Integer(), nullable=False),
+    sa.Column('grade_sum', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('period', 'bucket_start')
+    )
+    op.create_table('post_review_rollups',
+    sa.Column('period', sa.String(length=5), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('review_count', sa.Integer(), nullable=False),
+    sa.Column('grade_sum', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('period', 'bucket_start', 'post_id')
+    )
+    op.create_index('ix_post_review_rollups_post_id', 'post_review_rollups',
+                    ['post_id'], unique=False)
+    # История заполняется отдельно: python -m core.rollups
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_post_review_rollups_post_id',
+                  table_name='post_review_rollups')
+    op.drop_table('post_review_rollups')
+    op.drop_table('review_rollups')
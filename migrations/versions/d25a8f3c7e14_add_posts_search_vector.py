@@ -0,0 +1,42 @@
+"""Add posts search vector
+
+Revision ID: d25a8f3c7e14
+Revises: b71e05c9a3d8
+Create Date: 2026-10-18 13:21:50.602187
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd25a8f3c7e14'
+down_revision: Union[str, Sequence[str], None] = 'b71e05c9a3d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Только PostgreSQL: в SQLite поиск идёт по индексу в памяти процесса
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute(
+        "ALTER TABLE posts ADD COLUMN search_vector tsvector "
+        "GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(text, '')), 'B')"
+        ") STORED"
+    )
+    op.create_index('ix_posts_search_vector', 'posts', ['search_vector'],
+                    unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_posts_search_vector', table_name='posts')
+    op.drop_column('posts', 'search_vector')
@@ -0,0 +1,72 @@
+"""Partial indexes on active reviews and reviews archive
+
+Revision ID: e6b3d8a2f4c1
+Revises: c4e7a1f9d2b5
+Create Date: 2026-10-18 22:05:37.418260
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b3d8a2f4c1'
+down_revision: Union[str, Sequence[str], None] = 'c4e7a1f9d2b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('reviews', sa.Column('deactivated_at', sa.DateTime(),
+                                       nullable=True))
+    # Уже скрытые отзывы считаются скрытыми с момента миграции
+    op.execute(sa.text("UPDATE reviews SET deactivated_at = CURRENT_TIMESTAMP "
+                       "WHERE NOT is_active"))
+    op.drop_index('ix_reviews_comment_date_id', table_name='reviews')
+    op.create_index('ix_reviews_active_comment_date_id', 'reviews',
+                    ['comment_date', 'id'], unique=False,
+                    postgresql_where=sa.text('is_active'),
+                    sqlite_where=sa.text('is_active = 1'))
+    op.create_index('ix_reviews_active_post_id_comment_date_id', 'reviews',
+                    ['post_id', 'comment_date', 'id'], unique=False,
+                    postgresql_where=sa.text('is_active'),
+                    sqlite_where=sa.text('is_active = 1'))
+    op.create_index('ix_reviews_inactive_deactivated_at', 'reviews',
+                    ['deactivated_at'], unique=False,
+                    postgresql_where=sa.text('NOT is_active'),
+                    sqlite_where=sa.text('is_active = 0'))
+    op.create_table('reviews_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('comment', sa.String(), nullable=False),
+    sa.Column('comment_date', sa.DateTime(), nullable=False),
+    sa.Column('grade', sa.Integer(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('deactivated_at', sa.DateTime(), nullable=True),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_reviews_archive_post_id', 'reviews_archive',
+                    ['post_id'], unique=False)
+    op.create_index('ix_reviews_archive_user_id', 'reviews_archive',
+                    ['user_id'], unique=False)
+    # Статистика и агрегаты теперь без скрытых отзывов, пересчитать:
+    # python -m core.stats и python -m core.rollups
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reviews_archive_user_id', table_name='reviews_archive')
+    op.drop_index('ix_reviews_archive_post_id', table_name='reviews_archive')
+    op.drop_table('reviews_archive')
+    op.drop_index('ix_reviews_inactive_deactivated_at', table_name='reviews')
+    op.drop_index('ix_reviews_active_post_id_comment_date_id',
+                  table_name='reviews')
+    op.drop_index('ix_reviews_active_comment_date_id', table_name='reviews')
+    op.create_index('ix_reviews_comment_date_id', 'reviews',
+                    ['comment_date', 'id'], unique=False)
+    op.drop_column('reviews', 'deactivated_at')
@@ -0,0 +1,18 @@
+from core.database import Base
+from sqlalchemy import DateTime, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+import datetime
+
+
+class Follow(Base):
+    __tablename__ = "follows"
+    __table_args__ = (
+        Index("ix_follows_followee_id_follower_id",
+              "followee_id", "follower_id"),
+    )
+    follower_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    followee_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    date: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=datetime.datetime.now)
@@ -0,0 +1,16 @@
+from core.database import Base
+from sqlalchemy import Float, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+
+class PostStats(Base):
+    __tablename__ = "post_stats"
+    __table_args__ = (
+        Index("ix_post_stats_avg_grade_post_id", "avg_grade", "post_id"),
+    )
+    post_id: Mapped[int] = mapped_column(
+        ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    review_count: Mapped[int] = mapped_column(default=0)
+    grade_sum: Mapped[int] = mapped_column(default=0)
+    avg_grade: Mapped[float] = mapped_column(Float, default=0)
+    post: Mapped["Post"] = relationship("Post", back_populates="stats")
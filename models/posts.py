@@ -1,19 +1,30 @@
 from core.database import Base
-from sqlalchemy import String, DateTime, ForeignKey
+from sqlalchemy import String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import datetime
+from models.post_stats import PostStats
 
 
 class Post(Base):
     __tablename__ = "posts"
+    __table_args__ = (
+        Index("ix_posts_date_id", "date", "id"),
+        Index("ix_posts_user_id_date_id", "user_id", "date", "id"),
+    )
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     title: Mapped[str] = mapped_column(String)
     text: Mapped[str] = mapped_column(String(350))
     date: Mapped[datetime.datetime] = mapped_column(
-        DateTime, default=datetime.datetime.now())
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"),
-                                         nullable=False)
+        DateTime, default=datetime.datetime.now)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    deleted_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime, nullable=True)
     user: Mapped["User"] = relationship("User", back_populates="posts")
     reviews: Mapped[list["Review"]] = relationship("Review",
                                                    back_populates="post",
                                                    cascade="all, delete-orphan")
+    stats: Mapped["PostStats"] = relationship("PostStats",
+                                              back_populates="post",
+                                              uselist=False,
+                                              cascade="all, delete-orphan")
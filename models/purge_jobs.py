@@ -0,0 +1,34 @@
+from core.database import Base
+from sqlalchemy import String, DateTime, Index
+from sqlalchemy.orm import Mapped, mapped_column
+import datetime
+
+
+class PurgeJob(Base):
+    __tablename__ = "purge_jobs"
+    __table_args__ = (
+        Index("ix_purge_jobs_status", "status"),
+    )
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # "user" или "post"
+    kind: Mapped[str] = mapped_column(String(16))
+    target_id: Mapped[int] = mapped_column()
+    # pending -> running -> done | failed; failed повторяется,
+    # пока attempts < PURGE_MAX_ATTEMPTS
+    status: Mapped[str] = mapped_column(String(16), default="pending")
+    attempts: Mapped[int] = mapped_column(default=0, server_default="0")
+    # Аренда: задачу выполняет только owner, пока не истёк lease_until.
+    # Каждая пачка продлевает аренду
+    owner: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    lease_until: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime, nullable=True)
+    posts_deleted: Mapped[int] = mapped_column(default=0, server_default="0")
+    reviews_deleted: Mapped[int] = mapped_column(default=0,
+                                                 server_default="0")
+    error: Mapped[str | None] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=datetime.datetime.now)
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=datetime.datetime.now)
+    finished_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime, nullable=True)
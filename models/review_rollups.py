@@ -0,0 +1,29 @@
+from core.database import Base
+from sqlalchemy import String, DateTime, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+import datetime
+
+
+class ReviewRollup(Base):
+    # Число отзывов и сумма оценок за час или сутки
+    __tablename__ = "review_rollups"
+    period: Mapped[str] = mapped_column(String(4), primary_key=True)
+    bucket_start: Mapped[datetime.datetime] = mapped_column(
+        DateTime, primary_key=True)
+    review_count: Mapped[int] = mapped_column(default=0)
+    grade_sum: Mapped[int] = mapped_column(default=0)
+
+
+class PostReviewRollup(Base):
+    # То же по постам за сутки и за месяц: лучшие посты за период
+    __tablename__ = "post_review_rollups"
+    __table_args__ = (
+        Index("ix_post_review_rollups_post_id", "post_id"),
+    )
+    period: Mapped[str] = mapped_column(String(5), primary_key=True)
+    bucket_start: Mapped[datetime.datetime] = mapped_column(
+        DateTime, primary_key=True)
+    post_id: Mapped[int] = mapped_column(
+        ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    review_count: Mapped[int] = mapped_column(default=0)
+    grade_sum: Mapped[int] = mapped_column(default=0)
@@ -1,20 +1,43 @@
 from core.database import Base
-from sqlalchemy import String, DateTime, Boolean, ForeignKey
+from sqlalchemy import String, DateTime, Boolean, ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import datetime
 
 
 class Review(Base):
     __tablename__ = "reviews"
+    __table_args__ = (
+        # Чтение показывает только активные отзывы: частичные индексы без
+        # скрытых строк. Условие записано так же, как его рендерит запрос
+        # where(Review.is_active) в каждом диалекте, иначе индекс не выбирается
+        Index("ix_reviews_active_comment_date_id", "comment_date", "id",
+              postgresql_where=text("is_active"),
+              sqlite_where=text("is_active = 1")),
+        Index("ix_reviews_active_post_id_comment_date_id",
+              "post_id", "comment_date", "id",
+              postgresql_where=text("is_active"),
+              sqlite_where=text("is_active = 1")),
+        # Полные: внешние ключи и очистка видят все отзывы. По post_id -
+        # только ключ, страницы читаются из частичного индекса
+        Index("ix_reviews_user_id_comment_date_id",
+              "user_id", "comment_date", "id"),
+        Index("ix_reviews_post_id", "post_id"),
+        # Кандидаты в архив
+        Index("ix_reviews_inactive_deactivated_at", "deactivated_at",
+              postgresql_where=text("NOT is_active"),
+              sqlite_where=text("is_active = 0")),
+    )
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     comment:  Mapped[str] = mapped_column(String())
     comment_date: Mapped[datetime.datetime] = mapped_column(
-        DateTime, default=datetime.datetime.now())
+        DateTime, default=datetime.datetime.now)
     grade: Mapped[int] = mapped_column(nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
-    post_id: Mapped[int] = mapped_column(ForeignKey("posts.id"),
-                                         nullable=False)
+    deactivated_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime, nullable=True)
+    post_id: Mapped[int] = mapped_column(
+        ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
     post: Mapped["Post"] = relationship("Post", back_populates="reviews")
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"),
-                                         nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     user: Mapped["User"] = relationship("User", back_populates="reviews")
@@ -0,0 +1,25 @@
+from core.database import Base
+from sqlalchemy import String, DateTime, Boolean, Index
+from sqlalchemy.orm import Mapped, mapped_column
+import datetime
+
+
+class ReviewArchive(Base):
+    # Давно скрытые модерацией отзывы, перенесённые из reviews.
+    # Без внешних ключей: архив не должен мешать удалению постов
+    __tablename__ = "reviews_archive"
+    __table_args__ = (
+        Index("ix_reviews_archive_post_id", "post_id"),
+        Index("ix_reviews_archive_user_id", "user_id"),
+    )
+    id: Mapped[int] = mapped_column(primary_key=True)
+    comment: Mapped[str] = mapped_column(String())
+    comment_date: Mapped[datetime.datetime] = mapped_column(DateTime)
+    grade: Mapped[int] = mapped_column(nullable=False)
+    is_active: Mapped[bool] = mapped_column(Boolean, default=False)
+    deactivated_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime, nullable=True)
+    post_id: Mapped[int] = mapped_column(nullable=False)
+    user_id: Mapped[int] = mapped_column(nullable=False)
+    archived_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime, default=datetime.datetime.now)
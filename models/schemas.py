@@ -1,3 +1,5 @@
+import datetime
+from typing import Any
 from pydantic import BaseModel, Field, EmailStr
 
 
@@ -12,6 +14,16 @@ class UserBaseCreate(UserBase):
     pass
 
 
+class UserPublic(BaseModel):
+    name: str
+    email: EmailStr
+
+
+class UserPage(BaseModel):
+    items: list[UserPublic]
+    next_cursor: str | None = None
+
+
 class RefreshTokenRequest(BaseModel):
     refresh_token: str
 
@@ -26,6 +38,17 @@ class PostBaseCreate(PostBase):
     pass
 
 
+class PostPage(BaseModel):
+    items: list[PostBase]
+    next_cursor: str | None = None
+
+
+class PostStatsBase(BaseModel):
+    post_id: int
+    review_count: int
+    avg_grade: float
+
+
 class ReviewBase(BaseModel):
     comment: str
     grade: float
@@ -34,4 +57,69 @@ class ReviewBase(BaseModel):
 
 
 class CreateReview(ReviewBase):
-    pass
+    # Оценка хранится целым: дробную не принимаем, чтобы агрегаты
+    # считались по тому же значению, что лежит в reviews
+    grade: int
+
+
+class ReviewPage(BaseModel):
+    items: list[ReviewBase]
+    next_cursor: str | None = None
+
+
+class PostDetail(BaseModel):
+    id: int
+    title: str
+    text: str
+    date: datetime.datetime
+    user_id: int
+    author: str
+    review_count: int
+    avg_grade: float
+    reviews: ReviewPage
+
+
+class ReviewBucket(BaseModel):
+    start: datetime.datetime
+    review_count: int
+    avg_grade: float
+
+
+class TopPost(BaseModel):
+    post_id: int
+    review_count: int
+    avg_grade: float
+
+
+class ReviewStats(BaseModel):
+    from_: datetime.datetime = Field(alias="from")
+    to: datetime.datetime
+    bucket: str
+    series: list[ReviewBucket]
+    top_posts: list[TopPost]
+
+
+class BulkError(BaseModel):
+    index: int
+    detail: Any
+
+
+class BulkResult(BaseModel):
+    inserted: int
+    # В порядке входных элементов без тех, что попали в errors
+    ids: list[int]
+    errors: list[BulkError]
+
+
+class PurgeJobStatus(BaseModel):
+    id: int
+    kind: str
+    target_id: int
+    status: str
+    attempts: int
+    posts_deleted: int
+    reviews_deleted: int
+    error: str | None = None
+    created_at: datetime.datetime
+    updated_at: datetime.datetime
+    finished_at: datetime.datetime | None = None
@@ -0,0 +1,22 @@
+from core.database import Base
+from sqlalchemy import DateTime, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+import datetime
+
+
+class TimelineEntry(Base):
+    # Материализованная лента: пост автора, на которого подписан user_id
+    __tablename__ = "timeline_entries"
+    __table_args__ = (
+        Index("ix_timeline_entries_user_id_date_post_id",
+              "user_id", "date", "post_id"),
+        Index("ix_timeline_entries_user_id_author_id",
+              "user_id", "author_id"),
+    )
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    post_id: Mapped[int] = mapped_column(
+        ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    author_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"))
+    date: Mapped[datetime.datetime] = mapped_column(DateTime)
@@ -12,9 +12,13 @@ class User(Base):
     email: Mapped[str] = mapped_column(String, unique=True, index=True)
     password: Mapped[str] = mapped_column(String, nullable=False)
     date: Mapped[datetime.datetime] = mapped_column(
-        DateTime, default=datetime.datetime.now())
+        DateTime, default=datetime.datetime.now)
     is_active: Mapped[bool] = mapped_column(Boolean, default=False)
     is_admin: Mapped[bool] = mapped_column(Boolean, default=False)
+    follower_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    # Удалённый аккаунт скрыт сразу, строки удаляет фоновая очистка
+    deleted_at: Mapped[datetime.datetime | None] = mapped_column(
+        DateTime, nullable=True)
     posts: Mapped[list["Post"]] = relationship("Post", back_populates="user",
                                                cascade="all, delete-orphan")
     reviews: Mapped[list["Review"]] = relationship("Review",
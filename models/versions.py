@@ -0,0 +1,14 @@
+from core.database import Base
+from sqlalchemy import String, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+import datetime
+
+
+class CollectionVersion(Base):
+    __tablename__ = "collection_versions"
+    # Версия коллекции - сумма version по всем shard ключа
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    shard: Mapped[int] = mapped_column(primary_key=True, default=0,
+                                       server_default="0")
+    version: Mapped[int] = mapped_column(default=0)
+    updated_at: Mapped[datetime.datetime] = mapped_column(DateTime)
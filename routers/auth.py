@@ -1,30 +1,49 @@
-from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta, timezone
+import time
 import jwt
-from config import SECRET_KEY, ALGORITHM
+from config import (SECRET_KEY, ALGORITHM, AUTH_CACHE_TTL, AUTH_CACHE_SIZE,
+                    AUTH_USER_CACHE_TTL)
 from fastapi import Depends, HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
-from core.db_depends import get_db
+from core.db_depends import primary_session
 from sqlalchemy import select
 from models.users import User
+from core.cache import TTLCache
+from core.hashing import hashing_pool, bcrypt_hash, bcrypt_verify
+from core.timing import add_timing
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
 # создаём объект OAuth2, который указывает, что эндпоинт логина находится по адресу /users/token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/token")
 
+# Кэши аутентификации: токен -> email из sub, email -> пользователь.
+# user_emails - обратный индекс id -> email в user_cache для invalidate_user
+user_emails: dict[int, set[str]] = {}
+
+
+def _forget_email(email: str, user: User) -> None:
+    emails = user_emails.get(user.id)
+    if emails is not None:
+        emails.discard(email)
+        if not emails:
+            del user_emails[user.id]
+
+
+token_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL)
+user_cache = TTLCache(AUTH_CACHE_SIZE, AUTH_USER_CACHE_TTL,
+                      on_evict=_forget_email)
+
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+async def hash_password(password: str) -> str:
+    return await hashing_pool.run(bcrypt_hash, password)
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await hashing_pool.run(bcrypt_verify, plain_password,
+                                  hashed_password)
 
 
 def create_access_token(data: dict):
@@ -49,13 +68,25 @@ def create_refresh_token(data: dict):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme),
-                           db: AsyncSession = Depends(get_db)):
-    # token- извлекает токен из заголовка запроса с помощью OAuth2PasswordBearer
-    # Проверяет JWT и возвращает пользователя из базы
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",)
+def invalidate_user(user_id: int) -> None:
+    # Вызывается после изменения или удаления пользователя. Сбрасывает
+    # кэш только этого процесса, остальные - по AUTH_USER_CACHE_TTL
+    for email in user_emails.pop(user_id, ()):
+        user_cache.pop(email)
+
+
+def _principal(user: User) -> User:
+    # Копия вне сессии: commit в обработчике не должен "протухать"
+    # атрибуты объекта, который лежит в кэше
+    return User(id=user.id, name=user.name, email=user.email,
+                is_active=user.is_active, is_admin=user.is_admin)
+
+
+def _decode_subject(token: str,
+                    credentials_exception: HTTPException) -> str:
+    email = token_cache.get(token)
+    if email is not None:
+        return email
     try:
         # Декодирует JWT, проверяя его подпись с использованием SECRET_KEY и алгоритма
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -71,14 +102,47 @@ async def get_current_user(token: str = Depends(oauth2_scheme),
     # Этот блок перехватывает все остальные возможные ошибки, связанные с JWT
     except jwt.PyJWTError:
         raise credentials_exception
+    # Запись в кэше не должна пережить сам токен
+    lifetime = min(AUTH_CACHE_TTL, payload.get("exp", float("inf"))
+                   - datetime.now(timezone.utc).timestamp())
+    if lifetime > 0:
+        token_cache.set(token, email, lifetime)
+    return email
 
-    result = await db.scalars(select(User).where(User.email == email))
-    user = result.first()
+
+async def _resolve_user(token: str) -> User:
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",)
+    email = _decode_subject(token, credentials_exception)
+
+    user = user_cache.get(email)
+    if user is not None:
+        return user
+    # Соединение берётся только при промахе кэша и сразу возвращается
+    # в пул, а не держится до конца запроса
+    async with primary_session() as db:
+        result = await db.scalars(select(User).where(
+            User.email == email, User.deleted_at.is_(None)))
+        user = result.first()
     if user is None:
         raise credentials_exception
+    user = _principal(user)
+    user_cache.set(email, user)
+    user_emails.setdefault(user.id, set()).add(email)
     return user
 
 
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    # token- извлекает токен из заголовка запроса с помощью OAuth2PasswordBearer
+    # Проверяет JWT и возвращает пользователя из кэша или из базы
+    start = time.perf_counter()
+    try:
+        return await _resolve_user(token)
+    finally:
+        add_timing("auth", time.perf_counter() - start)
+
+
 async def get_current_superuser(
         current_superuser: User = Depends(get_current_user)):
     if not current_superuser.is_admin:
@@ -0,0 +1,36 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Request, status
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from core import database
+from config import READY_TIMEOUT
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/live")
+async def live() -> dict:
+    # Процесс жив и обслуживает event loop; база не проверяется
+    return {"status": "ok"}
+
+
+async def _select_one() -> None:
+    async with database.engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+@router.get("/ready")
+async def ready(request: Request) -> dict:
+    # 503, пока идёт прогрев, при остановке и без связи с основной базой
+    warmup = request.app.state.warmup
+    if not warmup.done or request.app.state.stopping:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Warming up" if not warmup.done
+                            else "Shutting down")
+    try:
+        await asyncio.wait_for(_select_one(), READY_TIMEOUT)
+    except (SQLAlchemyError, OSError, asyncio.TimeoutError):
+        # В том числе таймаут пула и ошибки диалекта, а не только DBAPI
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Database is unavailable")
+    return {"status": "ready", "warmup": warmup.steps}
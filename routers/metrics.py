@@ -0,0 +1,122 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from core import database
+from core.hashing import hashing_pool
+from core.replicas import replica_set
+from core.cache import response_cache
+from core.ratelimit import rate_limiter
+from core.pubsub import hub
+from core.metrics import CallbackMetric, registry
+from routers.auth import token_cache, user_cache
+from routers.posts import post_writes
+from routers.reviews import review_writes
+
+router = APIRouter(tags=["metrics"])
+
+
+def _databases() -> list[tuple[str, object, dict[str, int]]]:
+    # (метка, движок, счётчики событий пула): основная база и реплики
+    return [("primary", database.engine, database.pool_events)] + [
+        (f"replica{index}", replica, replica_set.pool_events[index])
+        for index, replica in enumerate(replica_set.engines)]
+
+
+def _pool_state() -> list[tuple[dict, float]]:
+    samples = []
+    for label, target, _ in _databases():
+        pool = target.sync_engine.pool
+        if not hasattr(pool, "checkedout"):
+            continue
+        samples += [({"database": label, "state": state}, value)
+                    for state, value in (
+                        ("checked_out", pool.checkedout()),
+                        ("idle", pool.checkedin()),
+                        ("overflow", max(pool.overflow(), 0)),
+                        ("size", pool.size()))]
+    return samples
+
+
+registry.register(CallbackMetric(
+    "db_pool_connections", "Connections in the pool by state", "gauge",
+    _pool_state))
+registry.register(CallbackMetric(
+    "db_pool_events_total", "Pool events by type", "counter",
+    lambda: [({"database": label, "event": name}, value)
+             for label, _, events in _databases()
+             for name, value in events.items()]))
+registry.register(CallbackMetric(
+    "db_pool_timeouts_total", "Requests rejected after pool_timeout",
+    "counter", lambda: [({}, database.pool_timeouts)]))
+registry.register(CallbackMetric(
+    "db_replica_up", "Whether a read replica is currently in rotation",
+    "gauge",
+    lambda: [({"replica": str(index)}, int(replica_set.is_up(index)))
+             for index in range(len(replica_set.engines))]))
+registry.register(CallbackMetric(
+    "db_reads_total", "Read-only sessions by target database", "counter",
+    lambda: [({"target": "primary"}, replica_set.primary_reads)]
+    + [({"target": f"replica{index}"}, reads)
+       for index, reads in enumerate(replica_set.reads)]))
+registry.register(CallbackMetric(
+    "db_replica_failures_total", "Times a replica was taken out of rotation",
+    "counter",
+    lambda: [({"replica": str(index)}, failures)
+             for index, failures in enumerate(replica_set.failures)]))
+registry.register(CallbackMetric(
+    "password_pool_tasks", "Password hashing tasks by state", "gauge",
+    lambda: [({"state": "in_flight"}, hashing_pool.in_flight),
+             ({"state": "queued"}, hashing_pool.queue_depth)]))
+registry.register(CallbackMetric(
+    "password_pool_tasks_total", "Finished password hashing tasks",
+    "counter",
+    lambda: [({"result": "completed"}, hashing_pool.completed),
+             ({"result": "rejected"}, hashing_pool.rejected)]))
+registry.register(CallbackMetric(
+    "password_pool_seconds_total", "Time password tasks spent queued/running",
+    "counter",
+    lambda: [({"phase": "wait"}, hashing_pool.wait_seconds),
+             ({"phase": "run"}, hashing_pool.run_seconds)]))
+registry.register(CallbackMetric(
+    "auth_cache_requests_total", "Auth cache lookups by cache and result",
+    "counter",
+    lambda: [({"cache": "token", "result": "hit"}, token_cache.hits),
+             ({"cache": "token", "result": "miss"}, token_cache.misses),
+             ({"cache": "user", "result": "hit"}, user_cache.hits),
+             ({"cache": "user", "result": "miss"}, user_cache.misses)]))
+registry.register(CallbackMetric(
+    "response_cache_requests_total",
+    "Response cache lookups by result; coalesced waited for another miss",
+    "counter",
+    lambda: [({"result": "hit"}, response_cache.hits),
+             ({"result": "miss"}, response_cache.misses),
+             ({"result": "coalesced"}, response_cache.coalesced)]))
+
+registry.register(CallbackMetric(
+    "auth_rate_limit_total",
+    "Login/signup attempts admitted or rejected by the rate limiter",
+    "counter",
+    lambda: [({"endpoint": scope, "result": result}, count)
+             for (scope, result), count in rate_limiter.counts.items()]))
+
+registry.register(CallbackMetric(
+    "write_coalescer_fallbacks_total",
+    "Coalesced batches that failed and were retried row by row", "counter",
+    lambda: [({"writer": writer.name}, writer.fallbacks)
+             for writer in (post_writes, review_writes)]))
+
+registry.register(CallbackMetric(
+    "live_subscribers", "Open live review streams in this worker", "gauge",
+    lambda: [({}, hub.subscribers)]))
+registry.register(CallbackMetric(
+    "live_messages_total",
+    "Live review events: published here, delivered to local subscribers, "
+    "slow subscribers dropped", "counter",
+    lambda: [({"result": "published"}, hub.published),
+             ({"result": "delivered"}, hub.delivered),
+             ({"result": "dropped"}, hub.dropped)]))
+
+
+@router.get("/metrics", response_class=PlainTextResponse,
+            include_in_schema=False)
+def metrics() -> str:
+    return registry.render()
@@ -1,62 +1,282 @@
-from fastapi import APIRouter, status, Depends, HTTPException
-from models.schemas import PostBase, PostBaseCreate
+import datetime
+from typing import Literal
+from fastapi import APIRouter, status, Depends, HTTPException, Query, Request
+from fastapi import Response, BackgroundTasks
+from models.schemas import PostBase, PostBaseCreate, PostPage, PostStatsBase
+from models.schemas import BulkResult, PostDetail
 from models.posts import Post
+from models.reviews import Review
+from models.post_stats import PostStats
 from models.users import User
-from sqlalchemy import select, update, delete
-from core.db_depends import get_db
+from sqlalchemy import select, insert, update, tuple_
+from core.db_depends import get_db, get_create_db, get_read_db, read_session
+from core.cache import response_cache
+from core.replicas import read_session_maker
+from core.pagination import clamp_limit, decode_cursor, keyset_page
+from core.export import export_response
+from core.bulk import read_bulk, batches
+from core.search import search_index, search_posts
+from core.versions import bump_versions, version_headers, post_reviews_key
+from core.timelines import fan_out
+from core.coalescer import WriteCoalescer
+from core.purge import create_job, run_purge
+from core.responses import fast_json
+from core.visibility import post_visible, review_visible
+from routers.reviews import review_page
 from sqlalchemy.ext.asyncio import AsyncSession
 from routers.auth import get_current_auth_user
+from config import PAGE_SIZE_DEFAULT, WRITE_COALESCING
 
 
 router = APIRouter(prefix="/posts", tags=["posts"],)
 
 
-@router.get("/", response_model=list[PostBase])
-async def get_all_posts(db: AsyncSession = Depends(get_db)):
-    posts = await db.scalars(select(Post))
-    return posts.all()
+@router.get("/", response_model=PostPage)
+async def get_all_posts(request: Request,
+                        limit: int = Query(PAGE_SIZE_DEFAULT, ge=1),
+                        cursor: str | None = None,
+                        user_id: int | None = None,
+                        sort: Literal["date", "rating"] = "date"):
+    limit = clamp_limit(limit)
+    keys = ("posts", "reviews") if sort == "rating" else ("posts",)
+    # Рейтинг берётся из предрассчитанной таблицы post_stats
+    if sort == "rating":
+        sort_key = (PostStats.avg_grade, PostStats.post_id)
+        sort_type = float
+    else:
+        sort_key = (Post.date, Post.id)
+        sort_type = datetime.datetime
+    # Только колонки ответа и ключ курсора: без сущностей в identity map
+    query = select(Post.title, Post.text, Post.user_id,
+                   sort_key[0].label("sort_value"), Post.id).order_by(
+        *(column.desc() for column in sort_key))
+    if sort == "rating":
+        query = query.join(PostStats, PostStats.post_id == Post.id)
+    query = query.where(post_visible())
+    if user_id is not None:
+        query = query.where(Post.user_id == user_id)
+    if cursor is not None:
+        query = query.where(tuple_(*sort_key) < decode_cursor(
+            cursor, sort_type, int))
+
+    async def load() -> Response:
+        # Сессия открывается только при промахе кэша
+        async with read_session(request) as db:
+            headers = await version_headers(db, *keys)
+            rows = (await db.execute(query.limit(limit + 1))).all()
+        page, next_cursor = keyset_page(rows, limit,
+                                        lambda row: (row.sort_value, row.id))
+        response = fast_json({"items": [{"title": row.title,
+                                         "text": row.text,
+                                         "user_id": row.user_id}
+                                        for row in page],
+                              "next_cursor": next_cursor})
+        response.headers.update(headers)
+        return response
+
+    return await response_cache.serve(request, keys, load)
+
+
+@router.get("/export")
+async def export_posts(request: Request,
+                       fmt: Literal["ndjson", "csv"] = Query("ndjson",
+                                                             alias="format"),
+                       user_auth: User = Depends(get_current_auth_user)):
+    query = select(Post.id, Post.title, Post.text, Post.date,
+                   Post.user_id).where(post_visible()).order_by(
+        Post.id)
+    return export_response(query, fmt, "posts",
+                           read_session_maker(request))
 
 
 @router.post("/", response_model=PostBase, status_code=status.HTTP_201_CREATED)
 async def create_post(post: PostBaseCreate,
+                      background_tasks: BackgroundTasks,
                       user_auth: User = Depends(get_current_auth_user),
-                      db: AsyncSession = Depends(get_db)
+                      db: AsyncSession = Depends(get_create_db)
                       ):
-    db_post = Post(**post.model_dump())
+    if WRITE_COALESCING:
+        # Раздача по лентам - после ответа, одной задачей на пачку
+        row = await post_writes.submit(post)
+        return row._asdict()
+    db_post = Post(**post.model_dump(), stats=PostStats())
     db.add(db_post)
+    await db.flush()
+    await bump_versions(db, "posts")
     await db.commit()
+    await response_cache.invalidate("posts")
     await db.refresh(db_post)
+    search_index.add(db_post.id, db_post.title, db_post.text)
+    background_tasks.add_task(fan_out, [db_post])
     return db_post
 
 
+async def insert_posts(db: AsyncSession, posts: list[PostBaseCreate]) -> list:
+    # Многострочный INSERT ... RETURNING пачкой. Строки возвращаются
+    # в порядке posts: в PostgreSQL это по-прежнему один запрос на пачку
+    # (SQLite порядок не гарантирует и пишет по строке)
+    result = await db.execute(
+        insert(Post).returning(Post.id, Post.title, Post.text, Post.date,
+                               Post.user_id, sort_by_parameter_order=True),
+        [post.model_dump() for post in posts])
+    rows = result.all()
+    await db.execute(insert(PostStats), [{"post_id": row.id}
+                                         for row in rows])
+    return rows
+
+
+async def _write_posts(db: AsyncSession, posts: list[PostBaseCreate]
+                       ) -> list:
+    rows = await insert_posts(db, posts)
+    await bump_versions(db, "posts")
+    return rows
+
+
+async def _posts_committed(rows: list) -> None:
+    await response_cache.invalidate("posts")
+    for row in rows:
+        search_index.add(row.id, row.title, row.text)
+
+
+post_writes = WriteCoalescer("posts", _write_posts, _posts_committed,
+                             fan_out)
+
+
+@router.post("/bulk", response_model=BulkResult,
+             status_code=status.HTTP_201_CREATED)
+async def create_posts_bulk(request: Request,
+                            background_tasks: BackgroundTasks,
+                            user_auth: User = Depends(get_current_auth_user),
+                            db: AsyncSession = Depends(get_db)):
+    valid, errors = await read_bulk(request, PostBaseCreate)
+    ids = []
+    for batch in batches(valid):
+        users = set(await db.scalars(select(User.id).where(
+            User.id.in_({post.user_id for _, post in batch}),
+            User.deleted_at.is_(None))))
+        posts = []
+        for index, post in batch:
+            if post.user_id in users:
+                posts.append(post)
+            else:
+                errors.append({"index": index, "detail": "User not found"})
+        if posts:
+            rows = await insert_posts(db, posts)
+            await bump_versions(db, "posts")
+            await db.commit()
+            await response_cache.invalidate("posts")
+            for row in rows:
+                search_index.add(row.id, row.title, row.text)
+            background_tasks.add_task(fan_out, rows)
+            # rows в порядке входных элементов (sort_by_parameter_order)
+            ids += [row.id for row in rows]
+    errors.sort(key=lambda error: error["index"])
+    return {"inserted": len(ids), "ids": ids, "errors": errors}
+
+
+@router.get("/search", response_model=PostPage)
+async def search(q: str = Query(min_length=1),
+                 limit: int = Query(PAGE_SIZE_DEFAULT, ge=1),
+                 cursor: str | None = None,
+                 db: AsyncSession = Depends(get_read_db)):
+    posts, next_cursor = await search_posts(db, q, clamp_limit(limit), cursor)
+    return {"items": posts, "next_cursor": next_cursor}
+
+
+@router.get("/{post_id}/stats", response_model=PostStatsBase)
+async def get_post_stats(post_id: int,
+                         db: AsyncSession = Depends(get_read_db)):
+    row = (await db.execute(
+        select(Post.id, PostStats.review_count, PostStats.avg_grade)
+        .outerjoin(PostStats, PostStats.post_id == Post.id)
+        .where(Post.id == post_id, post_visible()))).first()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="Post not found")
+    return {"post_id": post_id,
+            "review_count": row.review_count or 0,
+            "avg_grade": row.avg_grade or 0.0}
+
+
+@router.get("/{post_id}", response_model=PostDetail)
+async def get_post(post_id: int, request: Request,
+                   reviews_limit: int = Query(PAGE_SIZE_DEFAULT, ge=1)):
+    # Страница поста за фиксированное число запросов: пост с автором
+    # и рейтингом одним JOIN, первая страница отзывов вторым.
+    # Следующие страницы - GET /reviews/?post_id=...&cursor=...
+    limit = clamp_limit(reviews_limit)
+    keys = ("posts", "users", post_reviews_key(post_id))
+
+    async def load() -> Response:
+        async with read_session(request) as db:
+            headers = await version_headers(db, *keys)
+            post = (await db.execute(
+                select(Post.id, Post.title, Post.text, Post.date,
+                       Post.user_id, User.name.label("author"),
+                       PostStats.review_count, PostStats.avg_grade)
+                .join(User, User.id == Post.user_id)
+                .outerjoin(PostStats, PostStats.post_id == Post.id)
+                .where(Post.id == post_id,
+                       post_visible()))).first()
+            if post is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                    detail="Post not found")
+            rows = (await db.execute(
+                select(Review.comment, Review.grade, Review.post_id,
+                       Review.user_id, Review.comment_date, Review.id)
+                .where(Review.post_id == post_id, review_visible())
+                .order_by(Review.comment_date.desc(), Review.id.desc())
+                .limit(limit + 1))).all()
+        response = fast_json({"id": post.id, "title": post.title,
+                              "text": post.text, "date": post.date,
+                              "user_id": post.user_id,
+                              "author": post.author,
+                              "review_count": post.review_count or 0,
+                              "avg_grade": post.avg_grade or 0.0,
+                              "reviews": review_page(rows, limit)})
+        response.headers.update(headers)
+        return response
+
+    return await response_cache.serve(request, keys, load)
+
+
 @router.put('/{post_id}')
 async def update_post(post_id: int, post: PostBaseCreate,
                       user_auth: User = Depends(get_current_auth_user),
                       db: AsyncSession = Depends(get_db)):
-    db_post_result = await db.scalars(select(Post).where(Post.id == post_id))
-    db_post = db_post_result.first()
-    if not db_post:
+    result = await db.execute(
+        update(Post).where(Post.id == post_id, post_visible())
+        .values(**post.model_dump())
+        .returning(Post.id, Post.title, Post.text, Post.date, Post.user_id)
+    )
+    db_post = result.mappings().first()
+    if db_post is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Post not found")
-    await db.execute(
-        update(Post).where(Post.id == post_id).values(**post.model_dump())
-    )
+    await bump_versions(db, "posts")
     await db.commit()
-    await db.refresh(db_post)
+    await response_cache.invalidate("posts")
+    search_index.add(db_post["id"], db_post["title"], db_post["text"])
     return db_post
 
 
 @router.delete("/{post_id}")
-async def delete_post(post_id: int,
+async def delete_post(post_id: int, background_tasks: BackgroundTasks,
                       user_auth: User = Depends(get_current_auth_user),
                       db: AsyncSession = Depends(get_db)):
-    db_post_result = await db.scalars(select(Post).where(Post.id == post_id))
-    db_post = db_post_result.first()
-    if not db_post:
+    # Пост скрывается сразу, отзывы и саму строку удаляет фоновая очистка
+    result = await db.execute(
+        update(Post).where(Post.id == post_id, post_visible())
+        .values(deleted_at=datetime.datetime.now()).returning(Post.id)
+    )
+    if result.first() is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Post not found")
-    await db.execute(
-        delete(Post).where(Post.id == post_id)
-    )
+    job_id = await create_job(db, "post", post_id)
+    await bump_versions(db, "posts", "reviews", post_reviews_key(post_id))
     await db.commit()
-    return {"message": "Post was deleted"}
+    await response_cache.invalidate("posts", "reviews",
+                                    post_reviews_key(post_id))
+    search_index.remove(post_id)
+    background_tasks.add_task(run_purge, job_id)
+    return {"message": "Post was deleted", "purge_job_id": job_id}
@@ -0,0 +1,34 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.db_depends import get_db
+from models.purge_jobs import PurgeJob
+from models.schemas import PurgeJobStatus
+from models.users import User
+from routers.auth import get_current_superuser
+
+router = APIRouter(prefix="/purge-jobs", tags=["purge"])
+
+
+@router.get("/", response_model=list[PurgeJobStatus])
+async def list_purge_jobs(
+        job_status: Literal["pending", "running", "done", "failed"] | None
+        = Query(None, alias="status"),
+        current_user: User = Depends(get_current_superuser),
+        db: AsyncSession = Depends(get_db)):
+    query = select(PurgeJob).order_by(PurgeJob.id.desc()).limit(100)
+    if job_status is not None:
+        query = query.where(PurgeJob.status == job_status)
+    return (await db.scalars(query)).all()
+
+
+@router.get("/{job_id}", response_model=PurgeJobStatus)
+async def get_purge_job(job_id: int,
+                        current_user: User = Depends(get_current_superuser),
+                        db: AsyncSession = Depends(get_db)):
+    job = await db.get(PurgeJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="Purge job not found")
+    return job
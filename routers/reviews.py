@@ -1,45 +1,254 @@
-from fastapi import APIRouter, Depends, status, HTTPException
+import asyncio
+import datetime
+from typing import Literal
+import orjson
+from fastapi import APIRouter, Depends, status, HTTPException, Query, Request
+from fastapi import Response, WebSocket
+from fastapi.responses import StreamingResponse
+from starlette.requests import HTTPConnection
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
-from core.db_depends import get_db
+from sqlalchemy import select, insert, delete, update, tuple_
+from core.db_depends import get_db, get_create_db, read_session
+from core.cache import response_cache
+from core.replicas import read_session_maker
+from core.pagination import clamp_limit, decode_cursor, keyset_page
+from core.export import export_response
+from core.stats import apply_review_deltas
+from core.rollups import apply_rollup_deltas, review_stats
+from core.bulk import read_bulk, batches
+from core.versions import bump_versions, version_headers, post_reviews_key
+from core.responses import fast_json
+from core.coalescer import WriteCoalescer
+from core.pubsub import hub
+from core.visibility import post_visible, review_visible
 from models.reviews import Review
 from models.posts import Post
 from models.users import User
-from models.schemas import ReviewBase, CreateReview
-from routers.auth import get_current_auth_user
+from models.schemas import ReviewBase, CreateReview, ReviewPage, BulkResult
+from models.schemas import ReviewStats
+from routers.auth import get_current_auth_user, get_current_superuser
+from routers.auth import get_current_user
+from config import PAGE_SIZE_DEFAULT, WRITE_COALESCING, PUBSUB_HEARTBEAT
 
 
 router = APIRouter(prefix="/reviews", tags=["review"])
 
+# Отзыв в ответе GET /reviews/{post_id} и в событиях живой ленты
+REVIEW_COLUMNS = (Review.id, Review.comment, Review.comment_date,
+                  Review.grade, Review.is_active, Review.post_id,
+                  Review.user_id)
 
-@router.get("/", response_model=list[ReviewBase])
-async def all_reviews(db: AsyncSession = Depends(get_db)):
-    review = await db.scalars(select(Review))
-    return review.all()
+
+@router.get("/", response_model=ReviewPage)
+async def all_reviews(request: Request,
+                      limit: int = Query(PAGE_SIZE_DEFAULT, ge=1),
+                      cursor: str | None = None,
+                      user_id: int | None = None,
+                      post_id: int | None = None):
+    limit = clamp_limit(limit)
+    # С фильтром по посту - страницы после первой из GET /posts/{post_id}
+    # "users": удаление автора скрывает его отзывы под любым постом
+    keys = ((post_reviews_key(post_id), "users") if post_id is not None
+            else ("reviews",))
+    # Скрытые модерацией отзывы, отзывы удалённых авторов и к удалённым
+    # постам не показываются
+    query = select(Review.comment, Review.grade, Review.post_id,
+                   Review.user_id, Review.comment_date, Review.id).where(
+        review_visible()).order_by(Review.comment_date.desc(),
+                                   Review.id.desc())
+    if user_id is not None:
+        query = query.where(Review.user_id == user_id)
+    if post_id is not None:
+        query = query.where(Review.post_id == post_id)
+    if cursor is not None:
+        query = query.where(
+            tuple_(Review.comment_date, Review.id) < decode_cursor(
+                cursor, datetime.datetime, int))
+
+    async def load() -> Response:
+        async with read_session(request) as db:
+            headers = await version_headers(db, *keys)
+            rows = (await db.execute(query.limit(limit + 1))).all()
+        response = fast_json(review_page(rows, limit))
+        response.headers.update(headers)
+        return response
+
+    return await response_cache.serve(request, keys, load)
+
+
+def review_page(rows: list, limit: int) -> dict:
+    page, next_cursor = keyset_page(
+        rows, limit, lambda row: (row.comment_date, row.id))
+    return {"items": [{"comment": row.comment,
+                       "grade": float(row.grade),
+                       "post_id": row.post_id,
+                       "user_id": row.user_id}
+                      for row in page],
+            "next_cursor": next_cursor}
+
+
+@router.get("/export")
+async def export_reviews(request: Request,
+                         fmt: Literal["ndjson", "csv"] = Query("ndjson",
+                                                                alias="format"),
+                         post_id: int | None = None,
+                         include_inactive: bool = False,
+                         current_user: User = Depends(get_current_user)):
+    # Скрытые модерацией отзывы - только суперпользователю по флагу
+    if include_inactive and not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="Only superuser can perform this action")
+    query = select(Review.id, Review.comment, Review.comment_date,
+                   Review.grade, Review.is_active, Review.post_id,
+                   Review.user_id).where(review_visible(include_inactive))
+    if post_id is not None:
+        query = query.where(Review.post_id == post_id).order_by(
+            Review.comment_date, Review.id)
+    else:
+        query = query.order_by(Review.id)
+    return export_response(query, fmt, "reviews",
+                           read_session_maker(request))
+
+
+@router.get("/stats", response_model=ReviewStats)
+async def reviews_stats(request: Request,
+                        start: datetime.datetime | None = Query(
+                            None, alias="from"),
+                        end: datetime.datetime | None = Query(None,
+                                                              alias="to"),
+                        bucket: Literal["hour", "day"] = "day",
+                        top: int = Query(10, ge=0, le=100),
+                        min_reviews: int = Query(1, ge=1)):
+    # По умолчанию - последние 30 суток. Читает только агрегаты
+    # review_rollups/post_review_rollups
+    end = end or datetime.datetime.now()
+    start = start or end - datetime.timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="'from' must be earlier than 'to'")
+
+    async def load() -> Response:
+        async with read_session(request) as db:
+            headers = await version_headers(db, "reviews")
+            stats = await review_stats(db, start, end, bucket, top,
+                                       min_reviews)
+        response = fast_json(stats)
+        response.headers.update(headers)
+        return response
+
+    return await response_cache.serve(request, ("reviews",), load)
 
 
 @router.get("/{post_id}")
-async def post_reviews(post_id:  int, db: AsyncSession = Depends(get_db)):
-    post = await db.scalar(select(Post).where(
-        Post.id == post_id))
-    if post is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="There is no post found"
-        )
-    review = await db.scalars(select(Review).where(
-        Review.post_id == post_id))
-    return review.all()
+async def post_reviews(post_id:  int, request: Request):
+    key = post_reviews_key(post_id)
+    keys = (key, "users")
+
+    async def load() -> Response:
+        async with read_session(request) as db:
+            headers = await version_headers(db, *keys)
+            post = await db.scalar(select(Post.id).where(
+                Post.id == post_id, post_visible()))
+            if post is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="There is no post found"
+                )
+            rows = await db.execute(select(*REVIEW_COLUMNS).where(
+                Review.post_id == post_id, review_visible()))
+            response = fast_json([row._asdict() for row in rows])
+        response.headers.update(headers)
+        return response
+
+    return await response_cache.serve(request, keys, load)
+
+
+async def _post_exists(connection: HTTPConnection, post_id: int) -> bool:
+    async with read_session(connection) as db:
+        return await db.scalar(select(Post.id).where(
+            Post.id == post_id, post_visible())) is not None
+
+
+async def _sse_events(post_id: int):
+    with hub.subscribe(post_reviews_key(post_id)) as subscription:
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.get(),
+                                                 PUBSUB_HEARTBEAT)
+            except asyncio.TimeoutError:
+                # Комментарий SSE: держит соединение через прокси
+                yield b": ping\n\n"
+                continue
+            if message is None:
+                return
+            yield b"data: " + message + b"\n\n"
+
+
+@router.get("/{post_id}/live")
+async def post_reviews_stream(post_id: int, request: Request):
+    # Server-Sent Events вместо опроса GET /reviews/{post_id}: после
+    # проверки поста соединение в базу не ходит
+    if not await _post_exists(request, post_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="There is no post found")
+    await hub.start()
+    return StreamingResponse(_sse_events(post_id),
+                             media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache",
+                                      "X-Accel-Buffering": "no"})
+
+
+async def _until_disconnect(websocket: WebSocket) -> None:
+    # Сообщения клиента не нужны, читаем только ради закрытия соединения
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+
+@router.websocket("/{post_id}/live")
+async def post_reviews_socket(websocket: WebSocket, post_id: int):
+    if not await _post_exists(websocket, post_id):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION,
+                              reason="There is no post found")
+        return
+    await websocket.accept()
+    await hub.start()
+    with hub.subscribe(post_reviews_key(post_id)) as subscription:
+        closed = asyncio.ensure_future(_until_disconnect(websocket))
+        try:
+            while True:
+                message = asyncio.ensure_future(subscription.get())
+                await asyncio.wait({message, closed},
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if not message.done():
+                    message.cancel()
+                    return
+                if message.result() is None:
+                    # Клиент не успевал читать: пусть переподключится
+                    await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                    return
+                await websocket.send_text(message.result().decode())
+        finally:
+            closed.cancel()
+
+
+async def publish_reviews(event: str, reviews: list[dict]) -> None:
+    # После commit: событие в тему поста, сериализуется один раз.
+    # Все события отправляются одной пачкой
+    await hub.publish_many([
+        (post_reviews_key(review["post_id"]),
+         orjson.dumps({"event": event, "review": review}))
+        for review in reviews])
 
 
 @router.post("/", response_model=ReviewBase,
              status_code=status.HTTP_201_CREATED)
 async def create_review(review: CreateReview,
-                        db: AsyncSession = Depends(get_db),
+                        db: AsyncSession = Depends(get_create_db),
                         user_auth: User = Depends(get_current_auth_user)):
-
+    if WRITE_COALESCING:
+        return await review_writes.submit(review)
     post = await db.scalar(select(Post).where(
-        Post.id == review.post_id))
+        Post.id == review.post_id, post_visible()))
     if post is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -47,22 +256,160 @@ async def create_review(review: CreateReview,
         )
     db_review = Review(**review.model_dump())
     db.add(db_review)
+    await db.flush()
+    await apply_review_deltas(db, {review.post_id: (1, review.grade)})
+    await apply_rollup_deltas(db, [(db_review.comment_date, review.post_id,
+                                    review.grade)])
+    await bump_versions(db, "reviews", post_reviews_key(review.post_id))
     await db.commit()
+    await response_cache.invalidate("reviews",
+                                    post_reviews_key(review.post_id))
     await db.refresh(db_review)
+    await publish_reviews("created", [
+        {column.key: getattr(db_review, column.key)
+         for column in REVIEW_COLUMNS}])
     return db_review
 
 
+async def insert_reviews(db: AsyncSession,
+                         reviews: list[CreateReview]) -> list:
+    # Существование постов проверяет вызывающий код. Строки возвращаются
+    # в порядке reviews, как и в insert_posts
+    result = await db.execute(
+        insert(Review).returning(*REVIEW_COLUMNS,
+                                 sort_by_parameter_order=True),
+        [review.model_dump() for review in reviews])
+    rows = result.all()
+    deltas: dict[int, tuple[int, int]] = {}
+    for row in rows:
+        count, grade = deltas.get(row.post_id, (0, 0))
+        deltas[row.post_id] = (count + 1, grade + row.grade)
+    await apply_review_deltas(db, deltas)
+    await apply_rollup_deltas(db, [(row.comment_date, row.post_id, row.grade)
+                                   for row in rows])
+    return rows
+
+
+async def _write_reviews(db: AsyncSession, reviews: list[CreateReview]
+                         ) -> list:
+    # Существование постов - одним запросом на пачку; отзыв к
+    # несуществующему посту получает свою 404, остальные пишутся
+    posts = set(await db.scalars(select(Post.id).where(
+        Post.id.in_({review.post_id for review in reviews}),
+        post_visible())))
+    found = [review for review in reviews if review.post_id in posts]
+    rows = iter(())
+    if found:
+        rows = iter(await insert_reviews(db, found))
+        await bump_versions(db, "reviews", *{
+            post_reviews_key(review.post_id) for review in found})
+    results = []
+    for review in reviews:
+        if review.post_id in posts:
+            results.append(next(rows)._asdict())
+        else:
+            results.append(HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="There is no post found"))
+    return results
+
+
+async def _reviews_committed(reviews: list[dict]) -> None:
+    await response_cache.invalidate("reviews", *{
+        post_reviews_key(review["post_id"]) for review in reviews})
+    await publish_reviews("created", reviews)
+
+
+review_writes = WriteCoalescer("reviews", _write_reviews, _reviews_committed)
+
+
+@router.post("/bulk", response_model=BulkResult,
+             status_code=status.HTTP_201_CREATED)
+async def create_reviews_bulk(request: Request,
+                              db: AsyncSession = Depends(get_db),
+                              user_auth: User = Depends(get_current_auth_user)):
+    valid, errors = await read_bulk(request, CreateReview)
+    ids = []
+    for batch in batches(valid):
+        posts = set(await db.scalars(select(Post.id).where(
+            Post.id.in_({review.post_id for _, review in batch}),
+            post_visible())))
+        users = set(await db.scalars(select(User.id).where(
+            User.id.in_({review.user_id for _, review in batch}),
+            User.deleted_at.is_(None))))
+        reviews = []
+        for index, review in batch:
+            if review.post_id not in posts:
+                errors.append({"index": index,
+                               "detail": "There is no post found"})
+            elif review.user_id not in users:
+                errors.append({"index": index, "detail": "User not found"})
+            else:
+                reviews.append(review)
+        if reviews:
+            rows = await insert_reviews(db, reviews)
+            await bump_versions(db, "reviews", *{
+                post_reviews_key(review.post_id) for review in reviews})
+            await db.commit()
+            await response_cache.invalidate("reviews", *{
+                post_reviews_key(review.post_id) for review in reviews})
+            await publish_reviews("created", [row._asdict() for row in rows])
+            # rows в порядке входных элементов (sort_by_parameter_order)
+            ids += [row.id for row in rows]
+    errors.sort(key=lambda error: error["index"])
+    return {"inserted": len(ids), "ids": ids, "errors": errors}
+
+
+@router.post("/{review_id}/deactivate")
+async def deactivate_review(review_id: int,
+                            db: AsyncSession = Depends(get_db),
+                            current_user: User = Depends(
+                                get_current_superuser)):
+    # Модерация: отзыв пропадает из чтения и статистики, но остаётся
+    # в таблице до переноса в архив (python -m core.archive)
+    result = await db.execute(
+        update(Review).where(Review.id == review_id, Review.is_active)
+        .values(is_active=False, deactivated_at=datetime.datetime.now())
+        .returning(Review.post_id, Review.grade, Review.comment_date))
+    db_review = result.first()
+    if db_review is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="Active review not found")
+    await apply_review_deltas(db, {db_review.post_id: (-1, -db_review.grade)})
+    await apply_rollup_deltas(db, [(db_review.comment_date, db_review.post_id,
+                                    db_review.grade)], -1)
+    await bump_versions(db, "reviews", post_reviews_key(db_review.post_id))
+    await db.commit()
+    await response_cache.invalidate("reviews",
+                                    post_reviews_key(db_review.post_id))
+    await publish_reviews("deactivated", [{"id": review_id,
+                                           "post_id": db_review.post_id}])
+    return {"message": "Review was deactivated"}
+
+
 @router.delete('/{review_id}')
 async def delete_reviews(review_id: int,
                          db: AsyncSession = Depends(get_db),
                          get_user: User = Depends(get_current_auth_user)):
-    db_review_result = await db.scalars(select(Review).where(
-        Review.id == review_id))
-    db_review = db_review_result.first()
-    if not db_review:
+    result = await db.execute(delete(Review).where(
+            Review.id == review_id).returning(Review.post_id, Review.grade,
+                                              Review.comment_date,
+                                              Review.is_active))
+    db_review = result.first()
+    if db_review is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="Review not found")
-    await db.execute(delete(Review).where(
-            Review.id == review_id))
+    if db_review.is_active:
+        # Скрытый отзыв из статистики уже вычтен
+        await apply_review_deltas(db, {db_review.post_id: (-1,
+                                                           -db_review.grade)})
+        await apply_rollup_deltas(db, [(db_review.comment_date,
+                                        db_review.post_id,
+                                        db_review.grade)], -1)
+    await bump_versions(db, "reviews", post_reviews_key(db_review.post_id))
     await db.commit()
+    await response_cache.invalidate("reviews",
+                                    post_reviews_key(db_review.post_id))
+    await publish_reviews("deleted", [{"id": review_id,
+                                       "post_id": db_review.post_id}])
     return {"message": "Review was deleted"}
@@ -1,27 +1,54 @@
-from fastapi import APIRouter, status, Depends, HTTPException
-from models.schemas import UserBase, UserBaseCreate, RefreshTokenRequest
+import datetime
+from fastapi import APIRouter, status, Depends, HTTPException, Query
+from fastapi import BackgroundTasks
+from models.schemas import UserPublic, UserBaseCreate, RefreshTokenRequest, UserPage
+from models.schemas import PostPage
 from sqlalchemy import select, update, delete
-from core.db_depends import get_db
+from core.db_depends import get_db, get_read_db
+from core.database import upsert
+from core.pagination import clamp_limit, decode_cursor, keyset_page
+from core.timelines import backfill, read_feed
+from core.responses import fast_json
+from core.purge import create_job, run_purge
+from core.versions import bump_versions
+from core.cache import response_cache
+from core.ratelimit import throttle
 from models.users import User
+from models.follows import Follow
+from models.timelines import TimelineEntry
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordRequestForm
 from routers.auth import verify_password, hash_password, create_access_token
 from routers.auth import get_current_superuser, get_current_auth_user, create_refresh_token
+from routers.auth import invalidate_user, get_current_user
 import jwt
-from config import SECRET_KEY, ALGORITHM
+from config import SECRET_KEY, ALGORITHM, PAGE_SIZE_DEFAULT
 
 router = APIRouter(prefix="/users", tags=["users"],)
 
 
-@router.get("/", response_model=list[UserBase])
-async def get_all_users(current_user: User = Depends(get_current_superuser),
-                        db: AsyncSession = Depends(get_db)):
-    users = await db.scalars(select(User))
-    return users.all()
-
-
-@router.post("/", response_model=UserBase, status_code=status.HTTP_201_CREATED)
+@router.get("/", response_model=UserPage)
+async def get_all_users(limit: int = Query(PAGE_SIZE_DEFAULT, ge=1),
+                        cursor: str | None = None,
+                        current_user: User = Depends(get_current_superuser),
+                        db: AsyncSession = Depends(get_read_db)):
+    limit = clamp_limit(limit)
+    query = select(User.id, User.name, User.email).where(
+        User.deleted_at.is_(None)).order_by(User.id)
+    if cursor is not None:
+        (last_id,) = decode_cursor(cursor, int)
+        query = query.where(User.id > last_id)
+    rows = await db.execute(query.limit(limit + 1))
+    page, next_cursor = keyset_page(rows.all(), limit,
+                                    lambda row: (row.id,))
+    return fast_json({"items": [{"name": row.name, "email": row.email}
+                                for row in page],
+                      "next_cursor": next_cursor})
+
+
+@router.post("/", response_model=UserPublic, status_code=status.HTTP_201_CREATED)
 async def create_user(user: UserBaseCreate,
+                      throttled: None = Depends(throttle("signup")),
                       db: AsyncSession = Depends(get_db)):
     result = await db.scalars(select(User).where(User.email == user.email))
     if result.first():
@@ -30,7 +57,7 @@ async def create_user(user: UserBaseCreate,
     db_user = User(
         name=user.name,
         email=user.email,
-        password=hash_password(user.password)
+        password=await hash_password(user.password)
     )
     db.add(db_user)
     await db.commit()
@@ -40,11 +67,13 @@ async def create_user(user: UserBaseCreate,
 
 @router.post("/token")
 async def login(form_data: OAuth2PasswordRequestForm = Depends(),
+                throttled: None = Depends(throttle("login")),
                 db: AsyncSession = Depends(get_db)):
     result = await db.scalars(
-        select(User).where(User.email == form_data.username))
+        select(User).where(User.email == form_data.username,
+                           User.deleted_at.is_(None)))
     user = result.first()
-    if not user or not verify_password(form_data.password, user.password):
+    if not user or not await verify_password(form_data.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password")
@@ -85,7 +114,8 @@ async def refresh_token(body: RefreshTokenRequest,
         raise credentials_exception
 
     # проверяем, существует ли активный пользователь с указанным email
-    result = await db.scalars(select(User).where(User.email == email))
+    result = await db.scalars(select(User).where(
+        User.email == email, User.deleted_at.is_(None)))
     user = result.first()
     if user is None:
         raise credentials_exception
@@ -96,38 +126,109 @@ async def refresh_token(body: RefreshTokenRequest,
             "token_type": "bearer"}
 
 
-@router.put("/{user_id}", response_model=UserBase)
+@router.put("/{user_id}", response_model=UserPublic)
 async def update_user(user_id: int,
                       user: UserBaseCreate,
                       auth_user: User = Depends(get_current_auth_user),
                       db: AsyncSession = Depends(get_db)):
-    db_user_result = await db.scalars(select(User).where(User.id == user_id))
-    db_user = db_user_result.first()
-    if not db_user:
+    # Сначала дешёвая проверка, что пользователь есть: bcrypt не тратится
+    # на 404. Хэш считаем до UPDATE, чтобы не держать блокировку строки
+    # во время bcrypt
+    exists = await db.scalar(select(User.id).where(
+        User.id == user_id, User.deleted_at.is_(None)))
+    if exists is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="User not found")
-    await db.execute(
-        update(User).where(User.id == user_id).values(
+    password = await hash_password(user.password)
+    result = await db.execute(
+        update(User).where(User.id == user_id,
+                           User.deleted_at.is_(None)).values(
             name=user.name,
             email=user.email,
-            password=hash_password(user.password))
+            password=password).returning(User.name, User.email)
         )
+    db_user = result.mappings().first()
+    if db_user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="User not found")
+    # Имя автора показывается на странице поста
+    await bump_versions(db, "users")
     await db.commit()
-    await db.refresh(db_user)
+    await response_cache.invalidate("users")
+    invalidate_user(user_id)
     return db_user
 
 
 @router.delete("/{user_id}")
-async def delete_user(user_id: int,
+async def delete_user(user_id: int, background_tasks: BackgroundTasks,
                       auth_user: User = Depends(get_current_auth_user),
                       db: AsyncSession = Depends(get_db)):
-    db_user_result = await db.scalars(select(User).where(User.id == user_id))
-    db_user = db_user_result.first()
-    if not db_user:
+    # В транзакции запроса помечается только строка пользователя: его посты
+    # и отзывы скрывает чтение (core.visibility), а удаляет фоновая
+    # очистка пачками
+    result = await db.execute(
+        update(User).where(User.id == user_id, User.deleted_at.is_(None))
+        .values(deleted_at=datetime.datetime.now()).returning(User.id)
+    )
+    if result.first() is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
                             detail="User not found")
-    await db.execute(
-        delete(User).where(User.id == user_id)
-    )
+    job_id = await create_job(db, "user", user_id)
+    await bump_versions(db, "posts", "reviews", "users")
+    await db.commit()
+    await response_cache.invalidate("posts", "reviews", "users")
+    invalidate_user(user_id)
+    background_tasks.add_task(run_purge, job_id)
+    return {"message": "User was deleted", "purge_job_id": job_id}
+
+
+@router.get("/me/feed", response_model=PostPage)
+async def get_feed(limit: int = Query(PAGE_SIZE_DEFAULT, ge=1),
+                   cursor: str | None = None,
+                   current_user: User = Depends(get_current_user),
+                   db: AsyncSession = Depends(get_read_db)):
+    posts, next_cursor = await read_feed(db, current_user.id,
+                                         clamp_limit(limit), cursor)
+    return {"items": posts, "next_cursor": next_cursor}
+
+
+@router.post("/{user_id}/follow", status_code=status.HTTP_201_CREATED)
+async def follow_user(user_id: int,
+                      current_user: User = Depends(get_current_user),
+                      db: AsyncSession = Depends(get_db)):
+    if user_id == current_user.id:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="You cannot follow yourself")
+    if await db.scalar(select(User.id).where(
+            User.id == user_id, User.deleted_at.is_(None))) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="User not found")
+    result = await db.execute(
+        upsert(db, Follow.__table__).values(
+            follower_id=current_user.id, followee_id=user_id)
+        .on_conflict_do_nothing().returning(Follow.followee_id))
+    if result.first() is not None:
+        await db.execute(update(User).where(User.id == user_id).values(
+            follower_count=User.follower_count + 1))
+        await backfill(db, current_user.id, user_id)
+        await db.commit()
+    return {"message": "User was followed"}
+
+
+@router.delete("/{user_id}/follow")
+async def unfollow_user(user_id: int,
+                        current_user: User = Depends(get_current_user),
+                        db: AsyncSession = Depends(get_db)):
+    result = await db.execute(delete(Follow).where(
+        Follow.follower_id == current_user.id,
+        Follow.followee_id == user_id).returning(Follow.followee_id))
+    if result.first() is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail="You do not follow this user")
+    await db.execute(update(User).where(User.id == user_id).values(
+        follower_count=User.follower_count - 1))
+    await db.execute(delete(TimelineEntry).where(
+        TimelineEntry.user_id == current_user.id,
+        TimelineEntry.author_id == user_id))
     await db.commit()
-    return {"message": "User was deleted"}
+    return {"message": "User was unfollowed"}
@@ -0,0 +1,56 @@
+import os
+import tempfile
+
+# Окружение задаётся до импорта приложения, как в benchmarks.seed:
+# отдельная база SQLite, лимиты включаются в своих тестах
+os.environ["BENCHMARK_DATABASE_URL"] = "sqlite+aiosqlite:///" + os.path.join(
+    tempfile.mkdtemp(), "test.db")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+import pytest
+from sqlalchemy import event
+from benchmarks.seed import seed, open_client, login
+from core import database
+from core.cache import MemoryBackend, response_cache
+from routers.auth import token_cache, user_cache, user_emails
+from config import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL
+
+USERS, POSTS, REVIEWS = 5, 20, 200
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def client(monkeypatch):
+    # Свежая база и пустые кэши процесса на каждый тест
+    await seed(USERS, POSTS, REVIEWS)
+    token_cache.clear()
+    user_cache.clear()
+    user_emails.clear()
+    monkeypatch.setattr(response_cache, "backend",
+                        MemoryBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL))
+    async with open_client() as client:
+        yield client
+    # Соединения пула привязаны к event loop теста
+    await database.engine.dispose()
+
+
+@pytest.fixture
+async def auth(client):
+    return {"Authorization": f"Bearer {(await login(client))['access_token']}"}
+
+
+@pytest.fixture
+def statements():
+    # SQL, выполненные за время теста
+    recorded = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        recorded.append((statement, parameters))
+    event.listen(database.engine.sync_engine, "before_cursor_execute", record)
+    yield recorded
+    event.remove(database.engine.sync_engine, "before_cursor_execute", record)
@@ -0,0 +1,57 @@
+import asyncio
+import datetime
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+from core.coalescer import WriteCoalescer
+from core.database import async_session_maker
+from models.schemas import CreateReview
+from models.users import User
+from routers.reviews import _write_reviews
+from tests.conftest import POSTS
+
+pytestmark = pytest.mark.anyio
+
+
+async def _write_users(db, emails: list[str]) -> list:
+    result = await db.execute(
+        insert(User).returning(User.email, sort_by_parameter_order=True),
+        [{"name": email, "email": email, "password": "hash",
+          "date": datetime.datetime.now()} for email in emails])
+    return result.scalars().all()
+
+
+async def test_failed_row_does_not_fail_its_batch(client):
+    # Второй email уже занят: вся пачка падает на уникальном индексе,
+    # а повтор по одной в точках сохранения отдаёт ошибку только ему
+    writes = WriteCoalescer("users", _write_users, max_batch=3, max_delay=1)
+    emails = ["first@microblog.dev", "user1@microblog.dev",
+              "third@microblog.dev"]
+    results = await asyncio.gather(*(writes.submit(email)
+                                     for email in emails),
+                                   return_exceptions=True)
+    assert results[0] == "first@microblog.dev"
+    assert isinstance(results[1], Exception)
+    assert results[2] == "third@microblog.dev"
+    assert writes.fallbacks == 1
+    async with async_session_maker() as db:
+        stored = set(await db.scalars(select(User.email).where(
+            User.email.in_(emails))))
+    assert stored == set(emails)
+
+
+async def test_results_follow_submission_order(client):
+    writes = WriteCoalescer("reviews", _write_reviews, max_batch=3,
+                            max_delay=1)
+    reviews = [CreateReview(comment="first", grade=5, post_id=2, user_id=1),
+               CreateReview(comment="missing", grade=1, post_id=POSTS + 1,
+                            user_id=1),
+               CreateReview(comment="third", grade=3, post_id=1, user_id=2)]
+    results = await asyncio.gather(*(writes.submit(review)
+                                     for review in reviews),
+                                   return_exceptions=True)
+    assert (results[0]["comment"], results[0]["post_id"]) == ("first", 2)
+    assert isinstance(results[1], HTTPException)
+    assert results[1].status_code == 404
+    assert (results[2]["comment"], results[2]["post_id"]) == ("third", 1)
+    assert writes.fallbacks == 0
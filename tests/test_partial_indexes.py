@@ -0,0 +1,42 @@
+import pytest
+from core import database
+
+pytestmark = pytest.mark.anyio
+
+
+async def _plan(statements: list) -> list[str]:
+    # EXPLAIN QUERY PLAN каждого SELECT, выполненного запросом
+    plan = []
+    async with database.engine.connect() as conn:
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith("SELECT"):
+                continue
+            result = await conn.exec_driver_sql(
+                "EXPLAIN QUERY PLAN " + statement, parameters)
+            plan += [str(row[-1]) for row in result]
+    return plan
+
+
+@pytest.mark.parametrize("path, index", [
+    ("/reviews/", "ix_reviews_active_comment_date_id"),
+    ("/reviews/?post_id=1", "ix_reviews_active_post_id_comment_date_id"),
+])
+async def test_active_reviews_are_read_from_partial_index(
+        client, statements, path, index):
+    response = await client.get(path)
+    assert response.status_code == 200
+    plan = await _plan(statements)
+    assert any(index in line for line in plan), plan
+
+
+async def test_deactivated_review_leaves_post_reviews(client, auth):
+    review = (await client.get("/reviews/1")).json()[0]
+    response = await client.post(f"/reviews/{review['id']}/deactivate",
+                                 headers=auth)
+    assert response.status_code == 200
+    post_reviews = (await client.get("/reviews/1")).json()
+    assert review["id"] not in [item["id"] for item in post_reviews]
+    # В списке нет id; у сида комментарии уникальны
+    page = (await client.get("/reviews/?post_id=1")).json()["items"]
+    assert page
+    assert review["comment"] not in [item["comment"] for item in page]
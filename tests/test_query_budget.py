@@ -0,0 +1,23 @@
+import pytest
+from benchmarks.query_budget import CASES, run
+from core.cache import MemoryBackend, response_cache
+from config import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_endpoints_stay_within_query_budget(monkeypatch):
+    # Тот же прогон, что python -m benchmarks.query_budget, на своей базе
+    monkeypatch.setattr(response_cache, "backend",
+                        MemoryBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL))
+    problems = []
+    for row in await run(CASES):
+        if row["status"] >= 400:
+            problems.append(f"{row['name']}: HTTP {row['status']}")
+        if row["statements"] > row["budget"]:
+            problems.append(f"{row['name']}: {row['statements']} statements"
+                            f" > budget {row['budget']}")
+        if row["full_scans"]:
+            problems.append(f"{row['name']}: full scan of "
+                            + ", ".join(row["full_scans"]))
+    assert not problems, problems
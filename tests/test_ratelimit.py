@@ -0,0 +1,45 @@
+import pytest
+from fastapi import HTTPException
+import core.ratelimit as ratelimit
+from core.ratelimit import Bucket, MemoryBackend, RateLimiter
+
+pytestmark = pytest.mark.anyio
+
+PER_HOUR = 1 / 3600
+
+
+async def test_ip_bucket_rejects_after_burst():
+    limiter = RateLimiter(MemoryBackend(100), Bucket(2, PER_HOUR),
+                          Bucket(100, 1))
+    await limiter.check("login", "10.0.0.1", None)
+    await limiter.check("login", "10.0.0.1", None)
+    with pytest.raises(HTTPException) as error:
+        await limiter.check("login", "10.0.0.1", None)
+    assert error.value.status_code == 429
+    assert int(error.value.headers["Retry-After"]) > 0
+    # У другого адреса свой бакет
+    await limiter.check("login", "10.0.0.2", None)
+    assert limiter.counts["login", "rejected_ip"] == 1
+    assert limiter.counts["login", "admitted"] == 3
+
+
+async def test_email_bucket_is_shared_across_addresses():
+    limiter = RateLimiter(MemoryBackend(100), Bucket(100, 1),
+                          Bucket(1, PER_HOUR))
+    await limiter.check("login", "10.0.0.1", "User@microblog.dev")
+    with pytest.raises(HTTPException) as error:
+        await limiter.check("login", "10.0.0.2", " user@microblog.dev")
+    assert error.value.status_code == 429
+    assert limiter.counts["login", "rejected_email"] == 1
+    # Бакет email у регистрации свой
+    await limiter.check("signup", "10.0.0.3", "user@microblog.dev")
+
+
+async def test_login_is_rejected_before_password_check(client, monkeypatch):
+    monkeypatch.setattr(ratelimit, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(ratelimit, "rate_limiter", RateLimiter(
+        MemoryBackend(100), Bucket(2, PER_HOUR), Bucket(100, 1)))
+    form = {"username": "user2@microblog.dev", "password": "wrong-password"}
+    statuses = [(await client.post("/users/token", data=form)).status_code
+                for _ in range(3)]
+    assert statuses == [401, 401, 429]
@@ -0,0 +1,65 @@
+import time
+import pytest
+from fastapi import Request
+from core.cache import response_cache
+from core.replicas import (PRIMARY_HEADER, pinned_to_primary, primary_mark,
+                           replica_set)
+from config import REPLICA_STICKY_SECONDS
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_conditional_hit_does_not_touch_database(client, statements):
+    etag = (await client.get("/posts/")).headers["etag"]
+    statements.clear()
+    response = await client.get("/posts/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert statements == []
+
+
+async def test_conditional_miss_answers_before_page_query(client, statements):
+    etag = (await client.get("/posts/")).headers["etag"]
+    # Ответ вытеснен, версии коллекций не менялись
+    await response_cache.invalidate("posts")
+    statements.clear()
+    response = await client.get("/posts/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert len(statements) == 1
+    assert "collection_versions" in statements[0][0]
+
+
+async def test_changed_collection_is_reloaded(client, auth):
+    etag = (await client.get("/posts/")).headers["etag"]
+    response = await client.put("/posts/2", headers=auth, json={
+        "title": "Edited", "text": "Edited post", "user_id": 1})
+    assert response.status_code == 200
+    response = await client.get("/posts/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.headers["x-cache"] == "miss"
+
+
+def _request(value: str) -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/",
+                    "query_string": b"",
+                    "headers": [(PRIMARY_HEADER.lower().encode(),
+                                 value.encode())]})
+
+
+def test_primary_pin_is_signed_and_bounded(monkeypatch):
+    now = time.time()
+    signed = primary_mark(now + REPLICA_STICKY_SECONDS)
+    # Без реплик метка ничего не значит
+    assert not pinned_to_primary(_request(signed))
+    monkeypatch.setattr(replica_set, "engines", [object()])
+    assert pinned_to_primary(_request(signed))
+    assert not pinned_to_primary(_request(f"{now + 60:.3f}"))
+    assert not pinned_to_primary(_request(primary_mark(1e12)))
+    assert not pinned_to_primary(_request(primary_mark(now - 1)))
+
+
+async def test_forged_pin_does_not_bypass_cache(client):
+    await client.get("/posts/")
+    response = await client.get("/posts/",
+                                headers={PRIMARY_HEADER: "1e12"})
+    assert response.headers["x-cache"] == "hit"
@@ -0,0 +1,40 @@
+import pytest
+from sqlalchemy import select
+from core.database import async_session_maker
+from core.stats import rebuild_post_stats
+from models.post_stats import PostStats
+
+pytestmark = pytest.mark.anyio
+
+
+async def _stats(db) -> dict:
+    return {row.post_id: (row.review_count, row.grade_sum)
+            for row in await db.execute(select(
+                PostStats.post_id, PostStats.review_count,
+                PostStats.grade_sum))}
+
+
+async def test_fractional_grade_rejected(client, auth):
+    response = await client.post("/reviews/", headers=auth, json={
+        "comment": "Half", "grade": 4.5, "post_id": 1, "user_id": 1})
+    assert response.status_code == 422
+    response = await client.post("/reviews/bulk", headers=auth, json=[
+        {"comment": "Half", "grade": 2.5, "post_id": 2, "user_id": 1}])
+    assert response.json()["inserted"] == 0
+
+
+async def test_live_stats_match_rebuild(client, auth):
+    response = await client.post("/reviews/", headers=auth, json={
+        "comment": "New", "grade": 4.0, "post_id": 1, "user_id": 1})
+    assert response.status_code == 201
+    response = await client.post("/reviews/bulk", headers=auth, json=[
+        {"comment": "Bulk", "grade": grade, "post_id": post_id, "user_id": 2}
+        for post_id, grade in [(2, "4"), (3, 1), (3, 2)]])
+    assert response.status_code == 201
+    assert (await client.post("/reviews/5/deactivate",
+                              headers=auth)).status_code == 200
+    assert (await client.delete("/reviews/6", headers=auth)).status_code == 200
+    async with async_session_maker() as db:
+        live = await _stats(db)
+        await rebuild_post_stats(db)
+        assert live == await _stats(db)
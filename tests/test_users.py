@@ -0,0 +1,18 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+NEW_USER = {"name": "newbie", "email": "newbie@microblog.dev",
+            "password": "newbie-password"}
+
+
+async def test_user_responses_hide_password(client, auth):
+    response = await client.post("/users/", json=NEW_USER)
+    assert response.status_code == 201
+    assert response.json() == {"name": "newbie",
+                               "email": "newbie@microblog.dev"}
+    response = await client.put("/users/1", headers=auth, json={
+        **NEW_USER, "name": "renamed", "email": "renamed@microblog.dev"})
+    assert response.status_code == 200
+    assert response.json() == {"name": "renamed",
+                               "email": "renamed@microblog.dev"}